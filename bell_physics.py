@@ -4,14 +4,32 @@ Created on Mon Sep  2 17:29:08 2024
 
 @author: eleph
 """
+import math
 import numpy as np
 import time
+from collections import deque
 
 class init_physics:
     #define some physical parameters, like gravity etc.
     #use m/s as units I think. Need to convert that to pixel space, naturally
     #Also various plotting tools in here, because I can't think where else to put them
-    def __init__(self):
+    def __init__(self, integrator='symplectic', events=None):
+        #integrator is the time-stepping scheme for the bell (see init_bell.timestep):
+        #'symplectic' is semi-implicit Euler (velocity first, then angle), 'rk4' is classical Runge-Kutta.
+        #events (see init_bell.move_events) finds strikes, the clapper leaving the edge and stay hits within a step,
+        #and deals with them when they happen rather than at the end of the step. 'rk4' needs it, as otherwise these
+        #keep it first order, so it is on by default for 'rk4'. It is off by default for 'symplectic', which is then
+        #the original step.
+        if integrator not in ('symplectic', 'rk4'):
+            raise ValueError("Unknown integrator {0!r}".format(integrator))
+        if events is None:
+            events = integrator == 'rk4'
+        if integrator == 'rk4' and not events:
+            raise ValueError("The 'rk4' integrator needs events")
+        self.integrator = integrator
+        self.events = events
+        self.max_events = 16   #most events found in one step, after which the rest are dealt with at the end of it
+        self.event_tolerance = 1e-12   #how closely each event is found, in seconds
         self.pixels_x = 384
         self.pixels_y = 384
         self.FPS = 60
@@ -34,10 +52,48 @@ class init_physics:
         #Centre of the image is 0,0
         return self.pixels_x/2 + x*self.xscale, self.pixels_y/2 + y*self.yscale
 
+class ArrayRecord:
+    #Preallocated NumPy array of samples, filled in order. Reads like a list of the samples so far.
+    #Size it for the whole run (about run length/dt + 1 samples) and it never reallocates. If it does fill up,
+    #it doubles in size, so a run never fails part way through.
+    def __init__(self, size):
+        self.data = np.zeros(max(size, 1))
+        self.count = 0
+
+    def append(self, value):
+        if self.count == len(self.data):
+            self.data = np.concatenate([self.data, np.zeros(len(self.data))])
+        self.data[self.count] = value
+        self.count = self.count + 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.data[:self.count][index]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.data[:self.count], dtype=dtype)
+
+def make_record(record, record_length):
+    #Container for one recorded quantity under the given recording policy:
+    #'full' keeps everything in a list, 'ring' keeps the last record_length samples,
+    #'array' fills a preallocated array of record_length samples (growing it if need be) and 'off' keeps nothing.
+    if record == 'full':
+        return []
+    elif record == 'ring':
+        return deque(maxlen=record_length)
+    elif record == 'array':
+        return ArrayRecord(record_length)
+    elif record == 'off':
+        return None
+    raise ValueError("Unknown recording policy {0!r}".format(record))
+
 class init_bell:
     #class for attributes of the bell itself, eg. speed and location
 
-    def __init__(self, phy, init_angle):
+    def __init__(self, phy, init_angle, record='full', record_length=3):
+        #record sets what history is kept in rlengths, effect_forces, times and bell_angles (see make_record).
                 
         self.radius = 0.5    #radius of wheel (in m)
         self.garter_hole = np.pi/4  #position of the garter hole relative to the stay
@@ -56,7 +112,11 @@ class init_bell:
         self.max_length = 0.0   #max backstroke length
         
         self.rlength, self.effect_force = self.ropelength()
-        self.rlengths = []; self.effect_forces = []
+        self.record = record
+        self.rlengths = make_record(record, record_length); self.effect_forces = make_record(record, record_length)
+        #The previous two rope lengths, for finding the peak of the backstroke whatever is recorded
+        self.rlength_1 = 0.0; self.rlength_2 = 0.0
+        self.nsteps = 0
 
         self.volume = 0.0
 
@@ -65,6 +125,8 @@ class init_bell:
         self.m_1 = 500.0   #mass of bell (in kg)
         self.wheel_force = 0.0  #force on the bell wheel (as in, rope pull)
         self.stay_angle = 0.15 #how far over the top can the bell go (elastic collision)
+        self.stay_rest = 0.01 #with phy.events, a bell coming back off the stay slower than this stops against it
+        self.onstay = False   #True if the bell is held against a stay (only with phy.events)
         self.friction = 0.025 #friction parameter in arbitrary units
 
         self.clapper_accel = 0.0  #clapper angular acceleration
@@ -82,118 +144,161 @@ class init_bell:
         self.volume_ref = 0.0
         self.clapper_friction = 0.1*self.friction
         
-        self.bell_angles = [self.bell_angle]
-        self.times = [0.0]
+        self.bell_angles = make_record(record, record_length)
+        self.times = make_record(record, record_length)
+        if self.record != 'off':
+            self.bell_angles.append(self.bell_angle)
+            self.times.append(0.0)
         self.stay_hit = 0
 
+        self.update_coefficients(phy)
+
+    def update_coefficients(self, phy):
+        #Work out the constant parts of the equations of motion once, rather than every timestep.
+        #Call this again after changing any of the physical parameters (or phy.g).
+        self.g = phy.g
+        #Each one is a leading part of the original expression, so the arithmetic (and the answer) is unchanged.
+        self.grav_bell = -self.m_1*phy.g*self.l_1   #bell torque due to gravity
+        self.grav_pivot = self.m_2*phy.g*self.p   #clapper weight acting at the pivot
+        self.clapper_coupling = self.m_2*self.p*self.l_2
+        self.free_inertia = self.m_1*((1.0 + self.k_2)*self.l_1**2) + self.m_2*self.p**2
+        self.inv_m_1 = 1/self.m_1
+        self.wheel_inertia = (1.0 + self.k_1)*self.l_1**2
+        self.edge_length = (1.0 + self.k_1)*self.l_1
+        self.clapper_inertia = (1.0 + self.k_2)*self.l_2
+        self.joint_grav_bell = -self.l_1*self.m_1*phy.g
+        self.joint_grav_clapper = self.m_2*phy.g
+        self.joint_inertia = self.m_1*((1.0 + self.k_1)*self.l_1**2)
+        self.inv_total_mass = 1/(self.m_1 + self.m_2)
+        self.stay_limit = np.pi + self.stay_angle
+        self.stay_reflect = 2*np.pi + 2*self.stay_angle
+        self.ding_reset_limit = self.clapper_limit - 0.1
+
     def timestep(self, phy):
         #Do the timestep here, using only bell.force, which comes either from an input or the machine
         #Update the physics here
+        if phy.events:
+            self.move_events(phy)
+        elif phy.integrator == 'symplectic':
+            self.move(phy)
+        else:
+            raise ValueError("The {0!r} integrator needs events (see init_physics)".format(phy.integrator))
+            
+        self.rlength_2 = self.rlength_1; self.rlength_1 = self.rlength
+        self.rlength, self.effect_force = self.ropelength()
+        self.nsteps = self.nsteps + 1
+
+        if self.nsteps > 3: #Maximum height of previous backstroke. To allow for adjustment of tail end length.
+            if self.effect_force > 0.0 and self.rlength < self.rlength_1 and self.rlength_1 > self.rlength_2:
+                self.max_length = self.rlength
+                
+        #Adjust time step to match reality
+        #dt = time.time() - phy.time_reference  
+        #phy.time_reference = time.time()
+        #phy.dt = min(dt, 0.1)
+        
+                
+        phy.time = phy.time + phy.dt
+        if self.record != 'off':
+            self.rlengths.append(self.rlength); self.effect_forces.append(self.effect_force)
+            self.times.append(phy.time)
+            self.bell_angles.append(self.bell_angle)
+
+    def move(self, phy):
+        #The original step: semi-implicit Euler, with strikes and stay hits dealt with at the end of the step.
+        #Everything here is a plain float, so use the math module (much quicker than numpy on scalars).
+        #Squares are written out as x*x, which is what numpy does for x**2. math.sin and math.cos can differ from
+        #numpy's in the last place, so this matches the original expressions to within rounding, not bit for bit.
+        g = phy.g; dt = phy.dt
+        sin = math.sin; cos = math.cos
         if not self.onedge:     #CLAPPER IS NOT RESTING ON THE EDGE OF THE BELL
 
             #Acceleration due to gravity
-            num = -self.m_1*phy.g*self.l_1*np.sin(self.bell_angle) - self.m_2*phy.g*self.p*np.sin(self.bell_angle) 
-            num = num - self.m_2*self.p*self.l_2*self.clapper_velocity**2*np.sin(self.bell_angle-self.clapper_angle)
-            den = self.m_1*((1.0 + self.k_2)*self.l_1**2) + self.m_2*self.p**2
-            den = den + self.m_2*self.p*self.l_2*np.cos(self.bell_angle-self.clapper_angle)
+            sin_bell = sin(self.bell_angle)
+            sin_rel = sin(self.bell_angle-self.clapper_angle)
+            num = self.grav_bell*sin_bell - self.grav_pivot*sin_bell 
+            num = num - self.clapper_coupling*(self.clapper_velocity*self.clapper_velocity)*sin_rel
+            den = self.free_inertia + self.clapper_coupling*cos(self.bell_angle-self.clapper_angle)
             
             self.accel = num/den
             #self.accel = (-phy.g*np.sin(self.bell_angle))/((1.0 + self.k_1)*self.l_1)
             #Acceleration on the wheel due to the pull
-            self.accel = self.accel + (1/self.m_1)*self.wheel_force*self.radius/((1.0 + self.k_1)*self.l_1**2)
+            self.accel = self.accel + self.inv_m_1*self.wheel_force*self.radius/self.wheel_inertia
             #Friction (proportional to angular velocity. Increases with weight for now)
             self.accel = self.accel - self.velocity*self.friction
             
             #Velocity timestep (forward Euler)
-            self.velocity = self.velocity + self.accel*phy.dt 
-            #extra friction so it actually stops at some point
+            self.velocity = self.velocity + self.accel*dt 
+            #extra friction so it actually stops at some point (halves the speed every 1/FPS seconds, whatever dt is)
             if abs(self.velocity) < 0.01 and self.wheel_force == 0.0:
-                self.velocity = 0.5*self.velocity
+                self.velocity = 0.5**(dt*phy.FPS)*self.velocity
                 
             self.prev_angle = self.bell_angle
-            self.bell_angle = self.bell_angle + self.velocity*phy.dt
+            self.bell_angle = self.bell_angle + self.velocity*dt
                     
             #check if stay has been hit, and bounce if so
-            if self.bell_angle > np.pi + self.stay_angle:
-                self.velocity = -0.7*self.velocity
-                self.bell_angle = 2*np.pi + 2*self.stay_angle - self.bell_angle
-                if abs(self.velocity) > 1.0:
-                    self.stay_hit += 1
-            if self.bell_angle < -np.pi - self.stay_angle:
-                self.velocity = -0.7*self.velocity
-                self.bell_angle = -2*np.pi - 2*self.stay_angle - self.bell_angle
-
-                if abs(self.velocity) > 1.0:
-                    self.stay_hit += 1
+            self.stay_bounce(phy)
 
             #Update location of the clapper (using some physics which may well be dodgy)
-            num = -phy.g*np.sin(self.clapper_angle) - self.p*(self.accel*np.cos(self.bell_angle-self.clapper_angle) - self.velocity**2*np.sin(self.bell_angle-self.clapper_angle))
-            den = ((1.0 + self.k_2)*self.l_2)
-            self.clapper_accel = num/den
-            self.clapper_velocity = self.clapper_velocity + self.clapper_accel*phy.dt 
+            rel = self.bell_angle-self.clapper_angle
+            num = -g*sin(self.clapper_angle) - self.p*(self.accel*cos(rel) - (self.velocity*self.velocity)*sin(rel))
+            self.clapper_accel = num/self.clapper_inertia
+            self.clapper_velocity = self.clapper_velocity + self.clapper_accel*dt 
             self.clapper_accel = self.clapper_accel - self.clapper_friction*(self.clapper_velocity - self.velocity)
             #self.clapper_velocity = 0.0
     
             #Update clapper angle
-            self.clapper_angle = self.clapper_angle + self.clapper_velocity*phy.dt
+            self.clapper_angle = self.clapper_angle + self.clapper_velocity*dt
     
 
         else:   #Clapper is on the edge of the bell
             #Need to do the same physics initially as if they are not attached, to check if they should still be.
-            self.accel = (-phy.g*np.sin(self.bell_angle))/((1.0 + self.k_1)*self.l_1)
+            self.accel = (-g*sin(self.bell_angle))/self.edge_length
             #Acceleration on the wheel
-            self.accel = self.accel + (1/self.m_1)*self.wheel_force*self.radius/((1.0 + self.k_1)*self.l_1**2)
+            self.accel = self.accel + self.inv_m_1*self.wheel_force*self.radius/self.wheel_inertia
             #Friction (proportional to angular velocity. Increases with weight for now)
             self.accel = self.accel - self.velocity*self.friction
             
             old_velocity = self.velocity; old_angle = self.bell_angle
             #Velocity timestep (forward Euler)
-            self.velocity = self.velocity + self.accel*phy.dt 
-            #extra friction so it actually stops at some point
+            self.velocity = self.velocity + self.accel*dt 
+            #extra friction so it actually stops at some point (halves the speed every 1/FPS seconds, whatever dt is)
             if abs(self.velocity) < 0.01 and self.wheel_force == 0.0:
-                self.velocity = 0.5*self.velocity
+                self.velocity = 0.5**(dt*phy.FPS)*self.velocity
                 
             self.prev_angle = self.bell_angle
-            self.bell_angle = self.bell_angle + self.velocity*phy.dt
+            self.bell_angle = self.bell_angle + self.velocity*dt
                     
             #check if stay has been hit, and bounce if so
-            if self.bell_angle > np.pi + self.stay_angle:
-                self.velocity = -0.7*self.velocity
-                self.bell_angle = 2*np.pi + 2*self.stay_angle - self.bell_angle
-                if abs(self.velocity) > 1.0:
-                    self.stay_hit += 1
-
-            if self.bell_angle < -np.pi - self.stay_angle:
-                self.velocity = -0.7*self.velocity
-                self.bell_angle = -2*np.pi - 2*self.stay_angle - self.bell_angle
-                if abs(self.velocity) > 1.0:
-                    self.stay_hit += 1
+            self.stay_bounce(phy)
 
                 
             #Check if clapper needs to leave the bell
-            num = -phy.g*np.sin(self.clapper_angle) - self.p*(self.accel*np.cos(self.bell_angle-self.clapper_angle) - self.velocity**2*np.sin(self.bell_angle-self.clapper_angle))
-            den = ((1.0 + self.k_2)*self.l_2)
-            self.clapper_accel = num/den
+            rel = self.bell_angle-self.clapper_angle
+            num = -g*sin(self.clapper_angle) - self.p*(self.accel*cos(rel) - (self.velocity*self.velocity)*sin(rel))
+            self.clapper_accel = num/self.clapper_inertia
             self.clapper_accel = self.clapper_accel - self.clapper_friction*(self.clapper_velocity - self.velocity)
 
             if abs(self.velocity) < 0.05 and self.wheel_force == 0.0:
                 if abs(self.bell_angle + np.pi + self.stay_angle) < 0.01 or abs(self.bell_angle - np.pi - self.stay_angle) < 0.01:
                     self.velocity = 0.0
-                    self.bell_angle = np.sign(self.bell_angle)*(np.pi+self.stay_angle)
+                    self.bell_angle = math.copysign(self.stay_limit, self.bell_angle)
 
             elif self.clapper_accel*self.clapper_velocity > self.accel*self.velocity:   
                 #Do leave the bell, so update the clapper accordingly.
                 #Bell acceleration at this point is fine
                 self.onedge = False
                 #update (but no friction initially)
-                self.clapper_velocity = self.clapper_velocity + self.clapper_accel*phy.dt 
+                self.clapper_velocity = self.clapper_velocity + self.clapper_accel*dt 
                 #Update clapper angle
-                self.clapper_angle = self.clapper_angle + self.clapper_velocity*phy.dt
+                self.clapper_angle = self.clapper_angle + self.clapper_velocity*dt
 
             else:
                 #Clapper should still be attached, so scrap that physics and treat it as one body
-                num = -self.l_1*self.m_1*phy.g*np.sin(old_angle) - self.m_2*phy.g*(self.p*np.sin(old_angle) + self.l_2*np.sin(self.clapper_angle))
-                den = self.m_1*((1.0 + self.k_1)*self.l_1**2) + self.m_2*((1.0 + self.k_2)*(self.p + self.l_2*np.cos(old_angle - self.clapper_angle))**2)
+                sin_old = sin(old_angle)
+                num = self.joint_grav_bell*sin_old - self.joint_grav_clapper*(self.p*sin_old + self.l_2*sin(self.clapper_angle))
+                arm = self.p + self.l_2*cos(old_angle - self.clapper_angle)
+                den = self.joint_inertia + self.m_2*((1.0 + self.k_2)*(arm*arm))
                 self.accel = num/den
                 
                 #Acceleration on the wheel (this isn't quite accurate but meh)
@@ -203,19 +308,19 @@ class init_bell:
             
                 self.clapper_accel = self.accel
                 
-                self.velocity = old_velocity + self.accel*phy.dt
-                self.bell_angle = old_angle + self.velocity*phy.dt
+                self.velocity = old_velocity + self.accel*dt
+                self.bell_angle = old_angle + self.velocity*dt
 
                 self.clapper_velocity = self.velocity
                 #Update clapper angle
-                self.clapper_angle = self.clapper_angle + self.clapper_velocity*phy.dt
+                self.clapper_angle = self.clapper_angle + self.clapper_velocity*dt
 
                 
         #Check if bell has struck
         if self.clapper_angle - self.bell_angle < -self.clapper_limit:
             if self.ding_reset:
                 self.volume_ref = 0.2*abs(self.clapper_velocity-self.velocity)
-            avg_velocity = (1/(self.m_1 + self.m_2))*(self.m_1*self.velocity + self.m_2*self.clapper_velocity)
+            avg_velocity = self.inv_total_mass*(self.m_1*self.velocity + self.m_2*self.clapper_velocity)
             self.clapper_velocity = avg_velocity
             self.velocity = avg_velocity
             self.clapper_angle = -self.clapper_limit + self.bell_angle
@@ -223,7 +328,7 @@ class init_bell:
         elif self.clapper_angle - self.bell_angle > self.clapper_limit:
             if self.ding_reset:
                 self.volume_ref = 0.2*abs(self.clapper_velocity-self.velocity)
-            avg_velocity = (1/(self.m_1 + self.m_2))*(self.m_1*self.velocity + self.m_2*self.clapper_velocity)
+            avg_velocity = self.inv_total_mass*(self.m_1*self.velocity + self.m_2*self.clapper_velocity)
             self.clapper_velocity = avg_velocity
             self.velocity = avg_velocity
             self.clapper_angle = self.clapper_limit + self.bell_angle
@@ -233,52 +338,520 @@ class init_bell:
         if self.onedge and self.ding_reset:
             self.ding = True
             self.ding_reset = False
-            self.ding_time = phy.game_time
+            self.ding_time = phy.time + dt   #the end of this step, which is when the strike is found
         else:
             self.ding = False
             
-        if abs(self.clapper_angle - self.bell_angle) < self.clapper_limit - 0.1:
+        if abs(self.clapper_angle - self.bell_angle) < self.ding_reset_limit:
             self.ding_reset = True
-            
-        self.rlength, self.effect_force = self.ropelength()
-        self.rlengths.append(self.rlength); self.effect_forces.append(self.effect_force)
 
-        if len(self.rlengths) > 3: #Maximum height of previous backstroke. To allow for adjustment of tail end length.
-            if self.effect_force > 0.0 and self.rlengths[-1] < self.rlengths[-2] and self.rlengths[-2] > self.rlengths[-3]:
-                self.max_length = self.rlengths[-1]
-                
-        #Adjust time step to match reality
-        #dt = time.time() - phy.time_reference  
-        #phy.time_reference = time.time()
-        #phy.dt = min(dt, 0.1)
-        
-                
-        phy.time = phy.time + phy.dt
-        self.times.append(phy.time)
-        self.bell_angles.append(self.bell_angle)
+    def move_events(self, phy):
+        #The step with events (phy.events). Between events the motion is smooth, and is done with phy.integrator in
+        #one of four modes: the clapper swinging freely (free_derivatives) or resting on the edge, so that bell and
+        #clapper move as one body (joint_derivatives), and in either case the bell possibly held against a stay
+        #(held_derivatives). The events are whatever changes the motion (see event_values): the clapper striking or
+        #leaving the edge, the bell hitting or leaving a stay, and the slow-speed brake coming on or off. When one
+        #happens inside the step, the moment it happens is found (locate_event), it is dealt with there
+        #(handle_event), and the rest of the step carries on from that moment.
+        #The clapper stays on the edge for as long as it is pushed into it (edge_push). move instead decides once a
+        #step, and on small steps its clapper leaves and strikes again every other step, so it has no small-step
+        #limit. So the two do not agree to within the step error, and should each be compared with themselves.
+        self.ding = False
+        self.prev_angle = self.bell_angle
+        #Anything already past a stay or the edge (set from outside, say) is dealt with first, as move would
+        state = self.settle(phy, (self.bell_angle, self.velocity, self.clapper_angle, self.clapper_velocity), 0.0)
+        self.release(state)
+        braking = self.braking(state)
+        t = 0.0
+        nevents = 0
+        while t < phy.dt:
+            h = phy.dt - t
+            start = self.event_values(state, braking, state)
+            end_state = self.flow(phy, state, h, braking)
+            end = self.event_values(end_state, braking, state)
+            #An event just dealt with can leave its value at exactly zero, so zero counts as not yet happened at the start
+            crossed = [i for i in range(len(start)) if start[i] <= 0.0 <= end[i] and (start[i] < 0.0 or end[i] > 0.0)]
+            if not crossed:
+                state = end_state
+                break
+            if nevents == phy.max_events:
+                #Too many events in one step, which should not happen. Deal with the rest at the end of the step instead.
+                state = self.settle(phy, end_state, phy.dt)
+                break
+            names = event_names[self.onstay, self.onedge]
+            s, state, name = min(self.locate_event(phy, state, h, braking, i, start[i], end[i], end_state) + (names[i],)
+                                 for i in crossed)
+            t = t + s
+            if name == 'brake':
+                braking = not braking
+            else:
+                state = self.handle_event(phy, name, state, t)
+                braking = self.braking(state)
+            nevents = nevents + 1
         
+        self.bell_angle, self.velocity, self.clapper_angle, self.clapper_velocity = state
+        ignored_velocity, self.accel, ignored_clapper_velocity, self.clapper_accel = self.mode_derivatives()(*state)
+        if abs(self.clapper_angle - self.bell_angle) < self.ding_reset_limit:
+            self.ding_reset = True
+
+    def release(self, state):
+        #Lets go of the stay and the edge if nothing pushes the bell or clapper into them any more. An event only
+        #happens when its value crosses zero within a step, so one that is already past it at the start of the step
+        #(the rope force changed between steps, say) would otherwise never happen.
+        if self.onstay and self.stay_push(state) <= 0.0:
+            self.onstay = False
+        if self.onedge and self.edge_push(state, state[2] - state[0]) <= 0.0:
+            self.onedge = False
+            if self.onstay and self.stay_push(state) <= 0.0:
+                self.onstay = False
+
+    def mode_derivatives(self):
+        #The time derivatives for the mode the bell and clapper are in (see move_events)
+        if self.onstay:
+            return self.resting_derivatives if self.onedge else self.held_derivatives
+        return self.joint_derivatives if self.onedge else self.free_derivatives
+
+    def flow(self, phy, state, h, braking):
+        #Moves state (bell_angle, velocity, clapper_angle, clapper_velocity) on by h with phy.integrator, in the mode
+        #the bell and clapper are in now.
+        if phy.integrator == 'rk4':
+            step = rk4_step
+        elif phy.integrator == 'symplectic':
+            step = symplectic_step
+        else:
+            raise ValueError("Unknown integrator {0!r}".format(phy.integrator))
+        if not braking:
+            return step(self.mode_derivatives(), state, h)
+        #The slow-speed brake of move halves the speed every 1/FPS seconds. That is too quick to integrate along
+        #with the rest at larger steps, so it is done exactly. RK4 follows velocity*2**(FPS*time) instead of the
+        #velocity (an integrating factor), with the time added to the state. Symplectic Euler, which is only
+        #first order anyway, does half the brake before the step and half after.
+        if phy.integrator == 'symplectic':
+            brake = 0.5**(0.5*h*phy.FPS)
+            bell_angle, velocity, clapper_angle, clapper_velocity = step(self.free_derivatives,
+                (state[0], brake*state[1], state[2], state[3]), h)
+            return (bell_angle, brake*velocity, clapper_angle, clapper_velocity)
+        rate = math.log(2.0)*phy.FPS
+        def derivatives(bell_angle, scaled_velocity, clapper_angle, clapper_velocity, time):
+            factor = math.exp(rate*time)
+            d = self.free_derivatives(bell_angle, scaled_velocity/factor, clapper_angle, clapper_velocity)
+            return d[0], factor*d[1], d[2], d[3], 1.0
+        bell_angle, scaled_velocity, clapper_angle, clapper_velocity, time = step(derivatives, tuple(state) + (0.0,), h)
+        return (bell_angle, scaled_velocity*math.exp(-rate*h), clapper_angle, clapper_velocity)
+
+    def braking(self, state):
+        #Whether the slow-speed brake of move is on: bell swinging with the clapper free, no force on the rope and
+        #the bell nearly still
+        return not (self.onedge or self.onstay) and self.wheel_force == 0.0 and abs(state[1]) < 0.01
+
+    def event_values(self, state, braking, origin):
+        #One value for each event that can happen next (named in event_names), which goes from negative to zero or
+        #above when it happens, for state on the way from origin.
+        #Getting into a band (the brake, the reset) is measured in the direction of travel at origin, so that passing
+        #right through it within one step still counts.
+        bell_angle, velocity, clapper_angle, clapper_velocity = state
+        rel = clapper_angle - bell_angle
+        if self.onedge:
+            values = [-self.edge_push(state, rel)]
+        else:
+            #The clapper getting back near the middle, so that the next strike is a ding
+            if self.ding_reset:
+                reset = -1.0
+            else:
+                reset = self.ding_reset_limit - rel*math.copysign(1.0, origin[2] - origin[0])
+            values = [rel - self.clapper_limit, -self.clapper_limit - rel, reset]
+        if self.onstay:
+            values.append(-self.stay_push(state))
+            return values
+        values.append(bell_angle - self.stay_limit)
+        values.append(-self.stay_limit - bell_angle)
+        if not self.onedge:
+            if self.wheel_force != 0.0:
+                values.append(-1.0)
+            elif braking:
+                values.append(abs(velocity) - 0.01)
+            else:
+                values.append(0.01 - velocity*math.copysign(1.0, origin[1]))
+        return values
+
+    def locate_event(self, phy, state, h, braking, index, low_value, high_value, high_state):
+        #Finds when event index happens in a step of h from state, given its value at the start (low_value, zero or
+        #below) and at the end (high_value, high_state). Illinois (regula falsi), to within phy.event_tolerance.
+        #Returns the time and the state just after the event, so that it has happened.
+        low = 0.0; high = h
+        side = 0
+        for iteration in range(100):
+            if high - low <= phy.event_tolerance:
+                break
+            if high_value > low_value:
+                s = high - high_value*(high - low)/(high_value - low_value)
+            else:
+                s = low
+            if not low < s < high:
+                s = 0.5*(low + high)
+            new_state = self.flow(phy, state, s, braking)
+            value = self.event_values(new_state, braking, state)[index]
+            if value < 0.0:
+                low, low_value = s, value
+                if side == -1:
+                    high_value = 0.5*high_value
+                side = -1
+            else:
+                high, high_value, high_state = s, value, new_state
+                if side == 1:
+                    low_value = 0.5*low_value
+                side = 1
+        return high, high_state
+
+    def handle_event(self, phy, name, state, t):
+        #Deals with event name, which has just happened at state, t into the step. Returns the state after it.
+        bell_angle, velocity, clapper_angle, clapper_velocity = state
+        if name == 'strike':
+            return self.strike(phy, state, math.copysign(self.clapper_limit, clapper_angle - bell_angle), t)
+        elif name == 'leave':
+            self.onedge = False
+        elif name == 'stay':
+            return self.bounce(phy, state, math.copysign(self.stay_limit, bell_angle), t)
+        elif name == 'unstay':
+            self.onstay = False
+        elif name == 'reset':
+            self.ding_reset = True
+        return state
+
+    def settle(self, phy, state, t):
+        #Deals with a bell past a stay or a clapper past the edge all at once, as move does at the end of a step.
+        if abs(state[0]) > self.stay_limit:
+            state = self.bounce(phy, state, math.copysign(self.stay_reflect, state[0]) - state[0], t)
+        bell_angle, velocity, clapper_angle, clapper_velocity = state
+        if not self.onedge and abs(clapper_angle - bell_angle) > self.clapper_limit:
+            state = self.strike(phy, state, math.copysign(self.clapper_limit, clapper_angle - bell_angle), t)
+        return state
+
+    def strike(self, phy, state, edge, t):
+        #The clapper hits the bell at edge (+-clapper_limit relative to it), t into the step. As in move they then
+        #move at the same speed, and they stay together if the clapper is pushed into the edge. A bell held against
+        #a stay stays there if the clapper pushes it into the stay, and then takes all of the clapper's speed.
+        bell_angle, velocity, clapper_angle, clapper_velocity = state
+        if self.ding_reset:
+            self.volume_ref = 0.2*abs(clapper_velocity-velocity)
+            self.ding = True
+            self.ding_reset = False
+            self.ding_time = phy.time + t
+        avg_velocity = self.inv_total_mass*(self.m_1*velocity + self.m_2*clapper_velocity)
+        if self.onstay and avg_velocity*bell_angle > 0.0:
+            avg_velocity = 0.0
+        else:
+            self.onstay = False
+        state = (bell_angle, avg_velocity, bell_angle + edge, avg_velocity)
+        self.onedge = self.edge_push(state, edge) > 0.0
+        return state
+
+    def bounce(self, phy, state, bell_angle, t):
+        #The bell hits a stay and comes back from bell_angle at 0.7 times the speed, as in stay_bounce. If it comes
+        #back slower than stay_rest while pushed into the stay, it stops there instead, held by the stay.
+        #A clapper resting on the edge carries on at its own speed, so it either strikes again at once or comes away.
+        ignored_angle, velocity, clapper_angle, clapper_velocity = state
+        velocity = -0.7*velocity
+        if abs(velocity) > 1.0:
+            self.stay_hit += 1
+        if abs(velocity) < self.stay_rest:
+            held = (bell_angle, 0.0, clapper_angle + bell_angle - state[0], clapper_velocity)
+            if self.stay_push(held) > 0.0:
+                self.onstay = True
+                velocity = 0.0
+        if not self.onedge:
+            return (bell_angle, velocity, clapper_angle, clapper_velocity)
+        edge = math.copysign(self.clapper_limit, clapper_angle - state[0])
+        self.onedge = False
+        state = (bell_angle, velocity, bell_angle + edge, clapper_velocity)
+        if (clapper_velocity - velocity)*edge > 0.0:
+            return self.strike(phy, state, edge, t)
+        return state
+
+    def edge_push(self, state, edge):
+        #How hard a clapper at edge (+-clapper_limit from the bell), moving with the bell, is pushed into it: its
+        #acceleration through the edge, relative to the bell, if it were free. It stays on the edge while this is positive.
+        derivatives = self.held_derivatives if self.onstay else self.free_derivatives
+        ignored_velocity, accel, ignored_clapper_velocity, clapper_accel = derivatives(*state)
+        if edge > 0.0:
+            return clapper_accel - accel
+        return accel - clapper_accel
+
+    def stay_push(self, state):
+        #How hard a still bell at a stay is pushed into it: its acceleration towards the stay if it were let go,
+        #with the clapper as it is now. It stays held while this is positive.
+        derivatives = self.joint_derivatives if self.onedge else self.free_derivatives
+        ignored_velocity, accel, ignored_clapper_velocity, clapper_accel = derivatives(*state)
+        return math.copysign(1.0, state[0])*accel
+
+    def free_derivatives(self, bell_angle, velocity, clapper_angle, clapper_velocity):
+        #Time derivatives of (bell_angle, velocity, clapper_angle, clapper_velocity) with the clapper swinging freely
+        sin_bell = math.sin(bell_angle)
+        sin_rel = math.sin(bell_angle - clapper_angle); cos_rel = math.cos(bell_angle - clapper_angle)
+        num = self.grav_bell*sin_bell - self.grav_pivot*sin_bell - self.clapper_coupling*(clapper_velocity*clapper_velocity)*sin_rel
+        accel = num/(self.free_inertia + self.clapper_coupling*cos_rel)
+        accel = accel + self.inv_m_1*self.wheel_force*self.radius/self.wheel_inertia - velocity*self.friction
+        num = -self.g*math.sin(clapper_angle) - self.p*(accel*cos_rel - (velocity*velocity)*sin_rel)
+        return velocity, accel, clapper_velocity, num/self.clapper_inertia
+
+    def joint_derivatives(self, bell_angle, velocity, clapper_angle, clapper_velocity):
+        #Time derivatives of (bell_angle, velocity, clapper_angle, clapper_velocity) with the clapper resting on the edge,
+        #so moving with the bell as one body
+        sin_bell = math.sin(bell_angle)
+        num = self.joint_grav_bell*sin_bell - self.joint_grav_clapper*(self.p*sin_bell + self.l_2*math.sin(clapper_angle))
+        arm = self.p + self.l_2*math.cos(bell_angle - clapper_angle)
+        den = self.joint_inertia + self.m_2*((1.0 + self.k_2)*(arm*arm))
+        accel = num/den + self.wheel_force*self.radius/den - velocity*self.friction
+        return velocity, accel, velocity, accel
+
+    def held_derivatives(self, bell_angle, velocity, clapper_angle, clapper_velocity):
+        #Time derivatives with the bell held against a stay and the clapper swinging freely
+        return 0.0, 0.0, clapper_velocity, -self.g*math.sin(clapper_angle)/self.clapper_inertia
+
+    def resting_derivatives(self, bell_angle, velocity, clapper_angle, clapper_velocity):
+        #Time derivatives with the bell held against a stay and the clapper resting on the edge: nothing moves
+        return 0.0, 0.0, 0.0, 0.0
+
+    def stay_bounce(self, phy):
+        #check if stay has been hit, and bounce if so
+        if self.bell_angle > self.stay_limit:
+            self.velocity = -0.7*self.velocity
+            self.bell_angle = self.stay_reflect - self.bell_angle
+            if abs(self.velocity) > 1.0:
+                self.stay_hit += 1
+        if self.bell_angle < -self.stay_limit:
+            self.velocity = -0.7*self.velocity
+            self.bell_angle = -self.stay_reflect - self.bell_angle
+            if abs(self.velocity) > 1.0:
+                self.stay_hit += 1
+
     def ropelength(self):
         #Outputs the length of the rope above the garter hole, relative to the minimum.
         #Also outputs the maximum force available with direction.
-        hole_angle = self.bell_angle - np.pi + self.garter_hole
+        #Plain floats and the math module only, as this is called every step.
+        hole_angle = self.bell_angle - math.pi + self.garter_hole
         
         if hole_angle > 0.0:
             #Fully Handstroke
             length = self.radius*hole_angle + self.radius
             effect_force = -1.0
-        elif hole_angle <= -np.pi/2:
+        elif hole_angle <= -math.pi/2:
             #Fully backstroke
-            length = self.radius*(-np.pi/2 - hole_angle) + self.radius
+            length = self.radius*(-math.pi/2 - hole_angle) + self.radius
             effect_force = 1.0
         else:
-            #Somewhere in between 
-            xpos = self.radius + self.radius*np.sin(hole_angle)
-            ypos = self.radius - self.radius*np.cos(hole_angle)
-            vec1 = np.array([xpos, ypos])
-            vec2 = np.array([np.cos(hole_angle), np.sin(hole_angle)])
-            vec1  = vec1/np.linalg.norm(vec1); vec2  = vec2/np.linalg.norm(vec2);
-            length = np.sqrt(xpos**2 + ypos**2)
-            effect_force = -np.dot(vec1,vec2)
+            #Somewhere in between. The force is minus the cosine of the angle between the rope
+            #direction (xpos, ypos) and the unit vector (cos, sin) of the hole.
+            sin_hole = math.sin(hole_angle); cos_hole = math.cos(hole_angle)
+            xpos = self.radius + self.radius*sin_hole
+            ypos = self.radius - self.radius*cos_hole
+            length = math.sqrt(xpos*xpos + ypos*ypos)
+            effect_force = -(xpos*cos_hole + ypos*sin_hole)/length
                     
         return length, effect_force
-        
\ No newline at end of file
+
+    def ropelength_array(self, bell_angles):
+        #Same as ropelength, but for an array of bell angles
+        return ropelength_array(bell_angles, self.radius, self.garter_hole)
+
+#The events init_bell.move_events looks out for (see init_bell.event_values), by whether the bell is held against a
+#stay and whether the clapper is on the edge
+event_names = {(False, False): ('strike', 'strike', 'reset', 'stay', 'stay', 'brake'),
+               (False, True): ('leave', 'stay', 'stay'),
+               (True, False): ('strike', 'strike', 'reset', 'unstay'),
+               (True, True): ('leave', 'unstay')}
+
+def rk4_step(derivatives, state, dt):
+    #One classical Runge-Kutta step of the system d(state)/dt = derivatives(*state)
+    k1 = derivatives(*state)
+    k2 = derivatives(*[x + 0.5*dt*k for x, k in zip(state, k1)])
+    k3 = derivatives(*[x + 0.5*dt*k for x, k in zip(state, k2)])
+    k4 = derivatives(*[x + dt*k for x, k in zip(state, k3)])
+    return tuple([x + dt/6.0*(a + 2.0*b + 2.0*c + d) for x, a, b, c, d in zip(state, k1, k2, k3, k4)])
+
+def symplectic_step(derivatives, state, dt):
+    #One semi-implicit Euler step of the same system, for state (bell_angle, velocity, clapper_angle, clapper_velocity):
+    #the velocities first, from the accelerations at the start, and then the angles from the new velocities.
+    bell_angle, velocity, clapper_angle, clapper_velocity = state
+    ignored_velocity, accel, ignored_clapper_velocity, clapper_accel = derivatives(*state)
+    velocity = velocity + accel*dt
+    clapper_velocity = clapper_velocity + clapper_accel*dt
+    return (bell_angle + velocity*dt, velocity, clapper_angle + clapper_velocity*dt, clapper_velocity)
+
+def ropelength_array(bell_angles, radius, garter_hole):
+    #Vectorised ropelength. Gives identical values to init_bell.ropelength for each angle.
+    hole_angle = np.asarray(bell_angles, dtype=float) - np.pi + garter_hole
+    
+    sin_hole = np.sin(hole_angle); cos_hole = np.cos(hole_angle)
+    xpos = radius + radius*sin_hole
+    ypos = radius - radius*cos_hole
+    length = np.sqrt(xpos*xpos + ypos*ypos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effect_force = -(xpos*cos_hole + ypos*sin_hole)/length
+    
+    handstroke = hole_angle > 0.0
+    backstroke = hole_angle <= -np.pi/2
+    length = np.where(handstroke, radius*hole_angle + radius, length)
+    length = np.where(backstroke, radius*(-np.pi/2 - hole_angle) + radius, length)
+    effect_force = np.where(handstroke, -1.0, np.where(backstroke, 1.0, effect_force))
+    
+    return length, effect_force
+
+class BellBatch:
+    #Steps N independent bells at once. Holds the same state as init_bell, but each attribute is an array of length N.
+    #The physical parameters (masses, lengths etc.) are shared, and copied from a template init_bell.
+    #The free-clapper and clapper-on-edge branches of init_bell.timestep are done with masks, so this gives the same results.
+
+    def __init__(self, phy, init_angles, bell=None):
+        if bell is None:
+            bell = init_bell(phy, 0.0)
+
+        for name in ['radius', 'garter_hole', 'backstroke_pull', 'l_1', 'k_1', 'm_1', 'stay_angle', 'friction',
+                     'p', 'l_2', 'k_2', 'm_2', 'clapper_limit', 'clapper_friction']:
+            setattr(self, name, getattr(bell, name))
+
+        self.bell_angle = np.array(init_angles, dtype=float)
+        self.n = len(self.bell_angle)
+
+        self.onedge = np.zeros(self.n, dtype=bool)
+        self.ding = np.zeros(self.n, dtype=bool); self.ding_reset = np.ones(self.n, dtype=bool)
+        self.ding_time = np.zeros(self.n)
+
+        self.accel = np.zeros(self.n)
+        self.velocity = np.zeros(self.n)
+        self.prev_angle = self.bell_angle.copy()
+        self.max_length = np.zeros(self.n)
+        self.wheel_force = np.zeros(self.n)
+
+        self.clapper_accel = np.zeros(self.n)
+        self.clapper_velocity = np.zeros(self.n)
+        self.clapper_angle = self.bell_angle.copy()
+
+        self.strike_velocity = np.zeros(self.n)
+        self.volume_ref = np.zeros(self.n)
+        self.stay_hit = np.zeros(self.n, dtype=int)
+
+        self.rlength, self.effect_force = self.ropelength()
+        #The last three rope lengths, for finding the peak of the backstroke
+        self.rlength_1 = np.zeros(self.n); self.rlength_2 = np.zeros(self.n)
+        self.nsteps = 0
+
+        self.update_coefficients(phy)
+
+    #The parameters are shared by all the bells, so the constant coefficients are worked out in the same way
+    update_coefficients = init_bell.update_coefficients
+
+    def timestep(self, phy):
+        #Same physics as init_bell.timestep, for all the bells at once
+        if phy.events or phy.integrator != 'symplectic':
+            raise ValueError("BellBatch only does the original step (integrator='symplectic', events=False)")
+        free = ~self.onedge
+        edge = self.onedge
+        force = self.wheel_force
+        #Acceleration due to the rope (the same for both cases)
+        pull = self.inv_m_1*force*self.radius/self.wheel_inertia
+        
+        #CLAPPER IS NOT RESTING ON THE EDGE OF THE BELL
+        sin_bell = np.sin(self.bell_angle)
+        rel = self.bell_angle-self.clapper_angle
+        num = self.grav_bell*sin_bell - self.grav_pivot*sin_bell 
+        num = num - self.clapper_coupling*self.clapper_velocity**2*np.sin(rel)
+        den = self.free_inertia + self.clapper_coupling*np.cos(rel)
+        free_accel = num/den + pull - self.velocity*self.friction
+        
+        #Clapper is on the edge of the bell (check as if they are not attached first)
+        edge_accel = (-phy.g*sin_bell)/self.edge_length + pull - self.velocity*self.friction
+        
+        self.accel = np.where(free, free_accel, edge_accel)
+        
+        old_velocity = self.velocity; old_angle = self.bell_angle
+        #Velocity timestep (forward Euler)
+        self.velocity = self.velocity + self.accel*phy.dt
+        #extra friction so it actually stops at some point (halves the speed every 1/FPS seconds, whatever dt is)
+        self.velocity = np.where((np.abs(self.velocity) < 0.01) & (force == 0.0), 0.5**(phy.dt*phy.FPS)*self.velocity, self.velocity)
+        
+        self.prev_angle = self.bell_angle
+        self.bell_angle = self.bell_angle + self.velocity*phy.dt
+        
+        #check if stay has been hit, and bounce if so
+        over = self.bell_angle > self.stay_limit
+        self.velocity = np.where(over, -0.7*self.velocity, self.velocity)
+        self.bell_angle = np.where(over, self.stay_reflect - self.bell_angle, self.bell_angle)
+        self.stay_hit = self.stay_hit + (over & (np.abs(self.velocity) > 1.0))
+        under = self.bell_angle < -self.stay_limit
+        self.velocity = np.where(under, -0.7*self.velocity, self.velocity)
+        self.bell_angle = np.where(under, -self.stay_reflect - self.bell_angle, self.bell_angle)
+        self.stay_hit = self.stay_hit + (under & (np.abs(self.velocity) > 1.0))
+        
+        #Update location of the clapper
+        rel = self.bell_angle-self.clapper_angle
+        num = -phy.g*np.sin(self.clapper_angle) - self.p*(self.accel*np.cos(rel) - self.velocity**2*np.sin(rel))
+        clapper_accel = num/self.clapper_inertia
+        
+        #Free clappers: forward Euler, with the friction applied after the velocity update as in init_bell
+        free_clapper_velocity = self.clapper_velocity + clapper_accel*phy.dt
+        free_clapper_accel = clapper_accel - self.clapper_friction*(free_clapper_velocity - self.velocity)
+        #Clappers on the edge: friction first, then decide whether they stay there
+        edge_clapper_accel = clapper_accel - self.clapper_friction*(self.clapper_velocity - self.velocity)
+        
+        rest = edge & (np.abs(self.velocity) < 0.05) & (force == 0.0)
+        settle = rest & ((np.abs(self.bell_angle + np.pi + self.stay_angle) < 0.01) | (np.abs(self.bell_angle - np.pi - self.stay_angle) < 0.01))
+        leave = edge & ~rest & (edge_clapper_accel*self.clapper_velocity > self.accel*self.velocity)
+        attached = edge & ~rest & ~leave
+        
+        #Clapper should still be attached, so treat it as one body
+        joint_accel = self.joint_accel(old_angle, self.velocity, self.clapper_angle)
+        joint_velocity = old_velocity + joint_accel*phy.dt
+        
+        self.accel = np.where(attached, joint_accel, self.accel)
+        self.clapper_accel = np.where(free, free_clapper_accel, np.where(attached, joint_accel, edge_clapper_accel))
+        
+        self.bell_angle = np.where(attached, old_angle + joint_velocity*phy.dt, self.bell_angle)
+        self.bell_angle = np.where(settle, np.sign(self.bell_angle)*self.stay_limit, self.bell_angle)
+        self.velocity = np.where(attached, joint_velocity, np.where(settle, 0.0, self.velocity))
+        
+        self.clapper_velocity = np.where(free, free_clapper_velocity, self.clapper_velocity)
+        self.clapper_velocity = np.where(leave, self.clapper_velocity + edge_clapper_accel*phy.dt, self.clapper_velocity)
+        self.clapper_velocity = np.where(attached, self.velocity, self.clapper_velocity)
+        moves = free | leave | attached
+        self.clapper_angle = np.where(moves, self.clapper_angle + self.clapper_velocity*phy.dt, self.clapper_angle)
+        
+        #Check if bell has struck
+        rel = self.clapper_angle - self.bell_angle
+        below = rel < -self.clapper_limit
+        above = ~below & (rel > self.clapper_limit)
+        strike = below | above
+        self.volume_ref = np.where(strike & self.ding_reset, 0.2*np.abs(self.clapper_velocity-self.velocity), self.volume_ref)
+        avg_velocity = self.inv_total_mass*(self.m_1*self.velocity + self.m_2*self.clapper_velocity)
+        self.clapper_velocity = np.where(strike, avg_velocity, self.clapper_velocity)
+        self.velocity = np.where(strike, avg_velocity, self.velocity)
+        self.clapper_angle = np.where(below, -self.clapper_limit + self.bell_angle, self.clapper_angle)
+        self.clapper_angle = np.where(above, self.clapper_limit + self.bell_angle, self.clapper_angle)
+        self.onedge = strike
+        
+        self.ding = self.onedge & self.ding_reset
+        self.ding_reset = self.ding_reset & ~self.ding
+        self.ding_time = np.where(self.ding, phy.time + phy.dt, self.ding_time)
+        
+        self.ding_reset = self.ding_reset | (np.abs(self.clapper_angle - self.bell_angle) < self.ding_reset_limit)
+            
+        self.rlength_2 = self.rlength_1; self.rlength_1 = self.rlength
+        self.rlength, self.effect_force = self.ropelength()
+        self.nsteps = self.nsteps + 1
+
+        if self.nsteps > 3: #Maximum height of previous backstroke.
+            peak = (self.effect_force > 0.0) & (self.rlength < self.rlength_1) & (self.rlength_1 > self.rlength_2)
+            self.max_length = np.where(peak, self.rlength, self.max_length)
+        
+        phy.time = phy.time + phy.dt
+        
+    def joint_accel(self, bell_angle, velocity, clapper_angle):
+        #Acceleration of the bell and clapper moving as one body (see init_bell.joint_derivatives)
+        sin_bell = np.sin(bell_angle)
+        num = self.joint_grav_bell*sin_bell - self.joint_grav_clapper*(self.p*sin_bell + self.l_2*np.sin(clapper_angle))
+        den = self.joint_inertia + self.m_2*((1.0 + self.k_2)*(self.p + self.l_2*np.cos(bell_angle - clapper_angle))**2)
+        return num/den + self.wheel_force*self.radius/den - velocity*self.friction
+
+    def ropelength(self):
+        #Vectorised version of init_bell.ropelength
+        return ropelength_array(self.bell_angle, self.radius, self.garter_hole)
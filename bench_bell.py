@@ -0,0 +1,239 @@
+"""
+Timings for the bell simulator, printed to the screen.
+Run with `python bench_bell.py`.
+"""
+
+import time
+
+import numpy as np
+
+from bell_physics import init_bell, init_physics, BellBatch
+
+nsteps = 3600   #one minute of ringing at 60 FPS
+
+def ring(bell, phy, nsteps):
+    #Simple controller that pulls in the direction of travel, so the bell gets rung up and hits the stay
+    for step in range(nsteps):
+        bell.wheel_force = 600.0 if bell.velocity > 0.0 else -600.0
+        bell.timestep(phy)
+
+def original_move(bell, phy):
+    #init_bell.move as it was before the coefficients were worked out once (update_coefficients): every constant
+    #worked out again each step, and numpy's sin and cos on plain floats. Only here to time init_bell.move against.
+    if not bell.onedge:
+        num = -bell.m_1*phy.g*bell.l_1*np.sin(bell.bell_angle) - bell.m_2*phy.g*bell.p*np.sin(bell.bell_angle)
+        num = num - bell.m_2*bell.p*bell.l_2*bell.clapper_velocity**2*np.sin(bell.bell_angle-bell.clapper_angle)
+        den = bell.m_1*((1.0 + bell.k_2)*bell.l_1**2) + bell.m_2*bell.p**2
+        den = den + bell.m_2*bell.p*bell.l_2*np.cos(bell.bell_angle-bell.clapper_angle)
+        bell.accel = num/den
+        bell.accel = bell.accel + (1/bell.m_1)*bell.wheel_force*bell.radius/((1.0 + bell.k_1)*bell.l_1**2)
+        bell.accel = bell.accel - bell.velocity*bell.friction
+        bell.velocity = bell.velocity + bell.accel*phy.dt
+        if abs(bell.velocity) < 0.01 and bell.wheel_force == 0.0:
+            bell.velocity = 0.5*bell.velocity
+        bell.prev_angle = bell.bell_angle
+        bell.bell_angle = bell.bell_angle + bell.velocity*phy.dt
+        if bell.bell_angle > np.pi + bell.stay_angle:
+            bell.velocity = -0.7*bell.velocity
+            bell.bell_angle = 2*np.pi + 2*bell.stay_angle - bell.bell_angle
+            if abs(bell.velocity) > 1.0:
+                bell.stay_hit += 1
+        if bell.bell_angle < -np.pi - bell.stay_angle:
+            bell.velocity = -0.7*bell.velocity
+            bell.bell_angle = -2*np.pi - 2*bell.stay_angle - bell.bell_angle
+            if abs(bell.velocity) > 1.0:
+                bell.stay_hit += 1
+        num = -phy.g*np.sin(bell.clapper_angle) - bell.p*(bell.accel*np.cos(bell.bell_angle-bell.clapper_angle) - bell.velocity**2*np.sin(bell.bell_angle-bell.clapper_angle))
+        den = ((1.0 + bell.k_2)*bell.l_2)
+        bell.clapper_accel = num/den
+        bell.clapper_velocity = bell.clapper_velocity + bell.clapper_accel*phy.dt
+        bell.clapper_accel = bell.clapper_accel - bell.clapper_friction*(bell.clapper_velocity - bell.velocity)
+        bell.clapper_angle = bell.clapper_angle + bell.clapper_velocity*phy.dt
+    else:
+        bell.accel = (-phy.g*np.sin(bell.bell_angle))/((1.0 + bell.k_1)*bell.l_1)
+        bell.accel = bell.accel + (1/bell.m_1)*bell.wheel_force*bell.radius/((1.0 + bell.k_1)*bell.l_1**2)
+        bell.accel = bell.accel - bell.velocity*bell.friction
+        old_velocity = bell.velocity; old_angle = bell.bell_angle
+        bell.velocity = bell.velocity + bell.accel*phy.dt
+        if abs(bell.velocity) < 0.01 and bell.wheel_force == 0.0:
+            bell.velocity = 0.5*bell.velocity
+        bell.prev_angle = bell.bell_angle
+        bell.bell_angle = bell.bell_angle + bell.velocity*phy.dt
+        if bell.bell_angle > np.pi + bell.stay_angle:
+            bell.velocity = -0.7*bell.velocity
+            bell.bell_angle = 2*np.pi + 2*bell.stay_angle - bell.bell_angle
+            if abs(bell.velocity) > 1.0:
+                bell.stay_hit += 1
+        if bell.bell_angle < -np.pi - bell.stay_angle:
+            bell.velocity = -0.7*bell.velocity
+            bell.bell_angle = -2*np.pi - 2*bell.stay_angle - bell.bell_angle
+            if abs(bell.velocity) > 1.0:
+                bell.stay_hit += 1
+        num = -phy.g*np.sin(bell.clapper_angle) - bell.p*(bell.accel*np.cos(bell.bell_angle-bell.clapper_angle) - bell.velocity**2*np.sin(bell.bell_angle-bell.clapper_angle))
+        den = ((1.0 + bell.k_2)*bell.l_2)
+        bell.clapper_accel = num/den
+        bell.clapper_accel = bell.clapper_accel - bell.clapper_friction*(bell.clapper_velocity - bell.velocity)
+        if abs(bell.velocity) < 0.05 and bell.wheel_force == 0.0:
+            if abs(bell.bell_angle + np.pi + bell.stay_angle) < 0.01 or abs(bell.bell_angle - np.pi - bell.stay_angle) < 0.01:
+                bell.velocity = 0.0
+                bell.bell_angle = np.sign(bell.bell_angle)*(np.pi+bell.stay_angle)
+        elif bell.clapper_accel*bell.clapper_velocity > bell.accel*bell.velocity:
+            bell.onedge = False
+            bell.clapper_velocity = bell.clapper_velocity + bell.clapper_accel*phy.dt
+            bell.clapper_angle = bell.clapper_angle + bell.clapper_velocity*phy.dt
+        else:
+            num = -bell.l_1*bell.m_1*phy.g*np.sin(old_angle) - bell.m_2*phy.g*(bell.p*np.sin(old_angle) + bell.l_2*np.sin(bell.clapper_angle))
+            den = bell.m_1*((1.0 + bell.k_1)*bell.l_1**2) + bell.m_2*((1.0 + bell.k_2)*(bell.p + bell.l_2*np.cos(old_angle - bell.clapper_angle))**2)
+            bell.accel = num/den
+            bell.accel = bell.accel + bell.wheel_force*bell.radius/den
+            bell.accel = bell.accel - bell.velocity*bell.friction
+            bell.clapper_accel = bell.accel
+            bell.velocity = old_velocity + bell.accel*phy.dt
+            bell.bell_angle = old_angle + bell.velocity*phy.dt
+            bell.clapper_velocity = bell.velocity
+            bell.clapper_angle = bell.clapper_angle + bell.clapper_velocity*phy.dt
+    if bell.clapper_angle - bell.bell_angle < -bell.clapper_limit:
+        if bell.ding_reset:
+            bell.volume_ref = 0.2*abs(bell.clapper_velocity-bell.velocity)
+        avg_velocity = (1/(bell.m_1 + bell.m_2))*(bell.m_1*bell.velocity + bell.m_2*bell.clapper_velocity)
+        bell.clapper_velocity = avg_velocity
+        bell.velocity = avg_velocity
+        bell.clapper_angle = -bell.clapper_limit + bell.bell_angle
+        bell.onedge = True
+    elif bell.clapper_angle - bell.bell_angle > bell.clapper_limit:
+        if bell.ding_reset:
+            bell.volume_ref = 0.2*abs(bell.clapper_velocity-bell.velocity)
+        avg_velocity = (1/(bell.m_1 + bell.m_2))*(bell.m_1*bell.velocity + bell.m_2*bell.clapper_velocity)
+        bell.clapper_velocity = avg_velocity
+        bell.velocity = avg_velocity
+        bell.clapper_angle = bell.clapper_limit + bell.bell_angle
+        bell.onedge = True
+    else:
+        bell.onedge = False
+    if bell.onedge and bell.ding_reset:
+        bell.ding = True
+        bell.ding_reset = False
+        bell.ding_time = phy.time + phy.dt
+    else:
+        bell.ding = False
+    if abs(bell.clapper_angle - bell.bell_angle) < bell.clapper_limit - 0.1:
+        bell.ding_reset = True
+
+def time_move(move):
+    #Steps per second of move(bell, phy) on the ring controller, and the bell it leaves
+    phy = init_physics()
+    bell = init_bell(phy, 0.5, record='off')
+    start = time.perf_counter()
+    for step in range(nsteps):
+        bell.wheel_force = 600.0 if bell.velocity > 0.0 else -600.0
+        move(bell, phy)
+    return nsteps/(time.perf_counter() - start), bell
+
+def bench_timestep():
+    #Steps per second of the scalar init_bell: the whole timestep, and its movement part (init_bell.move) next to
+    #the original expressions (original_move)
+    phy = init_physics()
+    bell = init_bell(phy, 0.5, record='off')
+    start = time.perf_counter()
+    ring(bell, phy, nsteps)
+    elapsed = time.perf_counter() - start
+    print('init_bell.timestep: {0:.0f} steps/s'.format(nsteps/elapsed))
+    rate, bell = time_move(init_bell.move)
+    original_rate, original = time_move(original_move)
+    print('init_bell.move: {0:.0f} steps/s, original expressions: {1:.0f} steps/s ({2:.1f} times faster)'.format(
+        rate, original_rate, rate/original_rate))
+    #math.sin and np.sin can differ in the last place, so the two need not agree bit for bit
+    names = ['bell_angle', 'velocity', 'clapper_angle', 'clapper_velocity', 'accel', 'clapper_accel']
+    print('  largest difference at the end of the run: {0:.1e}'.format(max(
+        abs(getattr(bell, name) - getattr(original, name)) for name in names)))
+
+def bench_batch(n):
+    #Bell-steps per second of BellBatch with n bells
+    phy = init_physics()
+    batch = BellBatch(phy, np.linspace(-1, 1, n))
+    start = time.perf_counter()
+    for step in range(nsteps):
+        batch.wheel_force = np.where(batch.velocity > 0.0, 600.0, -600.0)
+        batch.timestep(phy)
+    elapsed = time.perf_counter() - start
+    print('BellBatch.timestep ({0} bells): {1:.0f} bell-steps/s'.format(n, n*nsteps/elapsed))
+
+control_fps = 15   #how often the controller in swing sets the rope force
+
+def swing(integrator, events, fps, seconds, force):
+    #Runs one bell from 0.5 radians at the given frame rate. force is the rope force as a function of the bell
+    #velocity, set control_fps times a second whatever the frame rate, so every run is pulled the same way.
+    #Returns the bell angle at each of those times, the ding times, the stay hits and the time taken.
+    phy = init_physics(integrator, events)
+    phy.dt = 1.0/fps
+    bell = init_bell(phy, 0.5)
+    every = fps//control_fps
+    dings = []
+    start = time.perf_counter()
+    for step in range(int(round(seconds*fps))):
+        if step % every == 0:
+            bell.wheel_force = force(bell.velocity)
+        bell.timestep(phy)
+        if bell.ding:
+            dings.append(bell.ding_time)
+    elapsed = time.perf_counter() - start
+    return np.array(bell.bell_angles)[::every], np.array(dings), bell.stay_hit, elapsed
+
+def accuracy_report(seconds=60.0):
+    #Error in the bell angle and the ding times at each frame rate, against a tiny-dt run of the same model.
+    #The original step (events=False) and the one with events have different rules for the clapper leaving the
+    #edge (see init_bell.move_events), so each has its own reference. Ringing up is chaotic once the bell hits
+    #the stays, so only its first 10 seconds show the error of the step itself.
+    cases = [('free swing', lambda velocity: 0.0), ('ringing up', lambda velocity: 200.0*np.tanh(5*velocity))]
+    references = {False: ('symplectic', 7680), True: ('rk4', 3840)}
+    early = int(10*control_fps) + 1
+    for name, force in cases:
+        reference = {}
+        for events, (integrator, fps) in references.items():
+            reference[events] = swing(integrator, events, fps, seconds, force)
+            print('{0}: reference {1} events={2} at {3} FPS, {4} dings, {5} stay hits'.format(
+                name, integrator, events, fps, len(reference[events][1]), reference[events][2]))
+        print('  (the references differ by up to {0:.2e} radians)'.format(
+            np.abs(reference[True][0] - reference[False][0]).max()))
+        print('  integrator  events  FPS  time (s)  max error (10 s)  max error ({0:.0f} s)  ding error (s)'.format(seconds))
+        for integrator, events in [('symplectic', False), ('symplectic', True), ('rk4', True)]:
+            angles_ref, dings_ref, stay_ref, ignored = reference[events]
+            for fps in [240, 120, 60, 30, 15]:
+                angles, dings, stay_hit, elapsed = swing(integrator, events, fps, seconds, force)
+                error = np.abs(angles - angles_ref)
+                n = min(len(dings), len(dings_ref))
+                ding_error = np.abs(dings[:n] - dings_ref[:n]).max() if n else float('nan')
+                print('  {0:<10} {1:>7} {2:>4} {3:>9.3f} {4:>17.2e} {5:>17.2e} {6:>15.2e}'.format(
+                    integrator, str(events), fps, elapsed, error[:early].max(), error.max(), ding_error))
+
+def release_check():
+    #Regression check for the step with events: a bell held on the stay, or a clapper resting on the edge, has to
+    #let go as soon as the rope pulls it off, even though nothing crosses zero within the step.
+    for integrator in ['rk4', 'symplectic']:
+        phy = init_physics(integrator, True)
+        bell = init_bell(phy, np.pi + 0.12, record='off')
+        for step in range(300):
+            bell.timestep(phy)
+        assert bell.onstay, 'bell did not settle on the stay ({0})'.format(integrator)
+        bell.wheel_force = -600.0
+        for step in range(120):
+            bell.timestep(phy)
+        assert not bell.onstay and bell.bell_angle < 2.5, 'bell stuck on the stay ({0})'.format(integrator)
+        
+        phy = init_physics(integrator, True)
+        bell = init_bell(phy, 1.0, record='off')
+        bell.clapper_angle = 1.0 + bell.clapper_limit
+        bell.wheel_force = -600.0
+        bell.timestep(phy)
+        assert bell.onedge, 'clapper did not rest on the edge ({0})'.format(integrator)
+        bell.wheel_force = 600.0
+        bell.timestep(phy)
+        assert not bell.onedge, 'clapper stuck on the edge ({0})'.format(integrator)
+    print('release_check: ok')
+
+if __name__ == '__main__':
+    bench_timestep()
+    for n in [10, 100, 2500]:
+        bench_batch(n)
+    release_check()
+    accuracy_report()
@@ -0,0 +1,122 @@
+"""
+Timings for neat.graphs on large synthetic genomes, printed to the screen,
+against the original (quadratic) implementations, which are kept here to
+check that the results are the same.
+Run with `python bench_graphs.py`.
+"""
+
+import random
+import time
+
+from neat.graphs import creates_cycle, required_for_output, feed_forward_layers
+
+
+def quadratic_creates_cycle(connections, test):
+    i, o = test
+    if i == o:
+        return True
+
+    visited = {o}
+    while True:
+        num_added = 0
+        for a, b in connections:
+            if a in visited and b not in visited:
+                if b == i:
+                    return True
+
+                visited.add(b)
+                num_added += 1
+
+        if num_added == 0:
+            return False
+
+
+def quadratic_required_for_output(inputs, outputs, connections):
+    required = set(outputs)
+    s = set(outputs)
+    while 1:
+        t = set(a for (a, b) in connections if b in s and a not in s)
+        if not t:
+            break
+
+        layer_nodes = set(x for x in t if x not in inputs)
+        if not layer_nodes:
+            break
+
+        required = required.union(layer_nodes)
+        s = s.union(t)
+
+    return required
+
+
+def quadratic_feed_forward_layers(inputs, outputs, connections):
+    required = quadratic_required_for_output(inputs, outputs, connections)
+
+    layers = []
+    s = set(inputs)
+    while 1:
+        c = set(b for (a, b) in connections if a in s and b not in s)
+        t = set()
+        for n in c:
+            if n in required and all(a in s for (a, b) in connections if b == n):
+                t.add(n)
+
+        if not t:
+            break
+
+        layers.append(t)
+        s = s.union(t)
+
+    return layers
+
+
+def synthetic_genome(nhidden, nconnections, ninputs=10, noutputs=5, seed=0):
+    #Random feed-forward topology: inputs, hidden nodes in a random order, then outputs, with connections
+    #only going forwards and mostly to nearby nodes, so the network is deep as well as wide
+    rng = random.Random(seed)
+    inputs = [-i - 1 for i in range(ninputs)]
+    outputs = list(range(noutputs))
+    hidden = list(range(noutputs, noutputs + nhidden))
+    order = inputs + rng.sample(hidden, nhidden) + outputs
+    connections = set()
+    while len(connections) < nconnections:
+        i = rng.randrange(len(order) - 1)
+        j = min(len(order) - 1, i + 1 + int(rng.expovariate(0.1)))
+        if order[j] not in inputs:
+            connections.add((order[i], order[j]))
+    return inputs, outputs, order, sorted(connections)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def bench(nhidden, nconnections, ntests=20):
+    inputs, outputs, order, connections = synthetic_genome(nhidden, nconnections)
+    print('{0} hidden nodes, {1} connections'.format(nhidden, nconnections))
+
+    new, t_new = timed(required_for_output, inputs, outputs, connections)
+    old, t_old = timed(quadratic_required_for_output, inputs, outputs, connections)
+    assert new == old
+    print('  required_for_output: {0:.4f} s (was {1:.4f} s)'.format(t_new, t_old))
+
+    new, t_new = timed(feed_forward_layers, inputs, outputs, connections)
+    old, t_old = timed(quadratic_feed_forward_layers, inputs, outputs, connections)
+    assert new == old
+    print('  feed_forward_layers: {0:.4f} s (was {1:.4f} s), {2} layers'.format(t_new, t_old, len(new)))
+
+    #Half the tests go backwards against the order, so mostly do make cycles
+    rng = random.Random(1)
+    tests = [tuple(rng.sample(order[len(inputs):], 2)) for n in range(ntests)]
+    new, t_new = timed(lambda: [creates_cycle(connections, test) for test in tests])
+    old, t_old = timed(lambda: [quadratic_creates_cycle(connections, test) for test in tests])
+    assert new == old
+    print('  creates_cycle: {0:.6f} s per test (was {1:.6f} s), {2} of {3} cycles'.format(
+        t_new/ntests, t_old/ntests, sum(new), ntests))
+
+
+if __name__ == '__main__':
+    for nhidden, nconnections in [(50, 200), (200, 1000), (500, 3000), (1000, 6000)]:
+        bench(nhidden, nconnections)
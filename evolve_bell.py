@@ -2,36 +2,48 @@
 Single-pole balancing experiment using a feed-forward neural network.
 """
 
+import functools
+import math
 import multiprocessing
 import os
 import pickle
 
-from main import run_bell, discrete_actuator_force, continuous_actuator_force
+from main import run_bell, run_bell_batch, discrete_actuator_force, continuous_actuator_force
 
 import main
 import neat
 import numpy as np
-from random import uniform, gauss
 
 runs_per_net = 10
 simulation_seconds = 60.0
 ngenerations = 50
+batched = False   #Evaluate the whole population in one batched simulation, rather than with ParallelEvaluator
+seed = 0   #Run r of every genome uses the random stream seeded with [seed, r], so fitnesses are repeatable
+racing = False   #Score everyone on cheap simulations first, and only give the best the full runs_per_net x simulation_seconds
+racing_schedule = [(2, 15.0, 0.5), (4, 30.0, 0.25)]   #(runs, seconds, fraction kept) for each cut before the full evaluation
+cache_fitness = True   #Reuse the fitness of genomes seen before (elites, clones), which the fixed seed makes valid
 
 # Use the NN network phenotype and the discrete actuator force function.
-def eval_genome(genome, config):
-    net = neat.nn.FeedForwardNetwork.create(genome, config)
+def eval_genome(genome, config, nruns=None, seconds=None):
+    #nruns and seconds default to runs_per_net and simulation_seconds
+    if nruns is None:
+        nruns = runs_per_net
+    if seconds is None:
+        seconds = simulation_seconds
+    net = neat.nn.CompiledFeedForwardNetwork.create(genome, config)   #compiled: same outputs as FeedForwardNetwork, less overhead per activate
 
     fitnesses = []
 
-    for runs in range(runs_per_net):
-        sim = run_bell()   #all the physics in here
-        sim.bell.bell_angle = uniform(-1,1)
+    for runs in range(nruns):
+        sim = run_bell(record='off', seed=[seed, runs])   #all the physics in here. No need for the history.
+        sim.bell.bell_angle = sim.rng.uniform(-1,1)
         sim.bell.velocity = 0.0
         # Run the given simulation for up to num_steps time steps.
-        angles = [sim.bell.bell_angle]
-        velocities = [sim.bell.bell_angle]
+        # Only the sum of the squared angles is needed, so keep a running total rather than a list.
+        angle_sum = sim.bell.bell_angle**2
+        nangles = 1
 
-        while sim.phy.time < simulation_seconds:
+        while sim.phy.time < seconds:
             #Inputs are the things we can know -- in my case it is the angle and speed of the bell (for now)
             #Do try to remember to get inputs in the range (0,1). Can do easily enough.
             inputs = sim.get_scaled_state()
@@ -42,21 +54,10 @@ def eval_genome(genome, config):
         
             sim.step(force)
 
-            angles.append(sim.bell.bell_angle)
+            angle_sum = angle_sum + sim.bell.bell_angle**2
+            nangles = nangles + 1
                 
-        angles = np.array(angles)
-        if True:   #Ringing up
-            if False:#sim.bell.stay_hit:
-                fitness = 0.0
-            else:
-                fitness = np.sum(np.array(angles)**2/np.pi**2)/len(np.array(angles))
-        elif False:   #Ringing down
-            fitness = np.sum((np.pi + sim.bell.stay_angle - np.abs(np.array(angles)))**2/np.pi**2)/len(np.array(angles))
-        if False:   #Hold on the balance?
-            db = (np.array(np.abs(angles)) - np.pi)**2/(np.pi**2)
-            fitness = 1.0 - np.sum(db)/len(db)
-    
-        fitness = np.sum(np.array(angles)**2/np.pi**2)/len(np.array(angles))/(sim.bell.stay_hit + 1)
+        fitness = angle_sum/np.pi**2/nangles/(sim.bell.stay_hit + 1)
         fitnesses.append(fitness)
     # The genome's fitness is its worst performance across all runs.
     return min(fitnesses)
@@ -66,6 +67,93 @@ def eval_genomes(genomes, config):
     for genome_id, genome in genomes:
         genome.fitness = eval_genome(genome, config)
 
+def eval_genomes_batched(genomes, config):
+    #Does the same as eval_genome for every genome, but with all genomes x runs_per_net bells in one simulation.
+    #Bell g*runs_per_net + r is run r of genome g.
+    nets = [neat.nn.FeedForwardNetwork.create(genome, config) for genome_id, genome in genomes]
+
+    sim = run_bell_batch(len(nets)*runs_per_net, seeds=[[seed, run] for net in nets for run in range(runs_per_net)])
+    sim.bell.bell_angle[:] = [rng.uniform(-1, 1) for rng in sim.rngs]
+    sim.bell.velocity[:] = 0.0
+    #Running sum of the squared angles, rather than keeping them all
+    angle_sums = sim.bell.bell_angle**2
+    nangles = 1
+    
+    force = np.zeros(sim.bell.n)
+    while sim.phy.time < simulation_seconds:
+        inputs = sim.get_scaled_state()
+        for g, net in enumerate(nets):
+            #One call for all of this genome's runs
+            runs = slice(g*runs_per_net, (g+1)*runs_per_net)
+            force[runs] = continuous_actuator_force(net.activate_batch(inputs[runs]).T)
+
+        sim.step(force)
+
+        angle_sums = angle_sums + sim.bell.bell_angle**2
+        nangles = nangles + 1
+    
+    fitnesses = angle_sums/np.pi**2/nangles/(sim.bell.stay_hit + 1)
+    # The genome's fitness is its worst performance across all runs.
+    fitnesses = fitnesses.reshape(len(nets), runs_per_net).min(axis=1)
+    for (genome_id, genome), fitness in zip(genomes, fitnesses):
+        genome.fitness = float(fitness)
+
+class RacingEvaluator(neat.ParallelEvaluator):
+    #Successive halving: everyone is scored on the first rung of the schedule (a few short runs), the best fraction
+    #go on to the next rung, and so on. Only those left at the end get the full runs_per_net x simulation_seconds.
+    #Run r is the same start in every rung, so a rung is just a cheaper look at the same test.
+    #Anyone cut at a rung gets their score from that rung, moved down if need be so it is below anyone who went
+    #further. So the final ordering has everyone promoted above everyone cut, the order within each cut is kept,
+    #and the full fitnesses are unchanged.
+    #With cache_fitness, each rung goes through its own FitnessCache, so a genome seen before is not run again at
+    #any rung. The scores a genome ends up with after moving down depend on the rest of the population, so they
+    #are never cached.
+    
+    margin = 1e-6   #how far below the lowest promoted fitness a cut is moved, relative to its size
+    
+    def __init__(self, num_workers, schedule, timeout=None, cache_fitness=False):
+        neat.ParallelEvaluator.__init__(self, num_workers, eval_genome, timeout)
+        self.schedule = schedule
+        self.simulated_seconds = 0.0   #total simulated time over all evaluates
+        self.full_seconds = 0.0   #what it would have been with everyone given the full runs
+        #The evaluation at each rung, and last the full one
+        self.rungs = []
+        for nruns, seconds in [(nruns, seconds) for nruns, seconds, keep in schedule] + [(runs_per_net, simulation_seconds)]:
+            rung = functools.partial(self.evaluate_rung, nruns=nruns, seconds=seconds)
+            if cache_fitness:
+                rung = neat.FitnessCache(rung, context=(seed, nruns, seconds)).evaluate
+            self.rungs.append(rung)
+        
+    def evaluate_rung(self, genomes, config, nruns, seconds):
+        #ParallelEvaluator.evaluate with nruns runs of seconds each
+        self.eval_function = functools.partial(eval_genome, nruns=nruns, seconds=seconds)
+        self.simulated_seconds = self.simulated_seconds + len(genomes)*nruns*seconds
+        neat.ParallelEvaluator.evaluate(self, genomes, config)
+        
+    def evaluate(self, genomes, config):
+        self.full_seconds = self.full_seconds + len(genomes)*runs_per_net*simulation_seconds
+        remaining = list(genomes)
+        cuts = []   #(score, genome) of those cut at each rung, best first
+        for (nruns, seconds, keep), rung in zip(self.schedule, self.rungs):
+            rung(remaining, config)
+            ranked = sorted(remaining, key=lambda item: item[1].fitness, reverse=True)
+            nkeep = max(1, int(math.ceil(keep*len(ranked))))
+            cuts.append([(genome.fitness, genome) for ignored_genome_id, genome in ranked[nkeep:]])
+            remaining = ranked[:nkeep]
+        self.rungs[-1](remaining, config)
+        
+        #Work back down the rungs, keeping everyone cut below everyone who got further. Moving a cut down by the
+        #same amount keeps its order whatever the sign of the fitnesses.
+        floor = min(genome.fitness for ignored_genome_id, genome in remaining)
+        for cut in reversed(cuts):
+            if not cut:
+                continue
+            top = cut[0][0]
+            shift = top - floor + self.margin*max(abs(floor), 1.0) if top >= floor else 0.0
+            for score, genome in cut:
+                genome.fitness = score - shift
+            floor = cut[-1][1].fitness
+
 def run():
     # Load the config file, which is assumed to live in
     # the same directory as this script.
@@ -82,10 +170,24 @@ def run():
     pop.add_reporter(stats)
     pop.add_reporter(neat.StdOutReporter(True))
 
-    #pe = neat.ParallelEvaluator(multiprocessing.cpu_count(), eval_genome)
-    pe = neat.ParallelEvaluator(multiprocessing.cpu_count()-1, eval_genome)
-
-    winner = pop.run(pe.evaluate,n=ngenerations)
+    if batched:
+        winner = pop.run(eval_genomes_batched,n=ngenerations)
+    elif racing:
+        racer = RacingEvaluator(multiprocessing.cpu_count()-1, racing_schedule, cache_fitness=cache_fitness)
+        winner = pop.run(racer.evaluate,n=ngenerations)
+        print('Racing: {0:.0f} s simulated, against {1:.0f} s for the full runs ({2:.0%})'.format(
+            racer.simulated_seconds, racer.full_seconds, racer.simulated_seconds/racer.full_seconds))
+    else:
+        #pe = neat.ParallelEvaluator(multiprocessing.cpu_count(), eval_genome)
+        pe = neat.ParallelEvaluator(multiprocessing.cpu_count()-1, eval_genome)
+
+        if cache_fitness:
+            #Anything else the fitness depends on goes in the context
+            fc = neat.FitnessCache(pe.evaluate, context=(seed, runs_per_net, simulation_seconds))
+            winner = pop.run(fc.evaluate,n=ngenerations)
+            print('Fitness cache: {0} hits, {1} misses'.format(fc.hits, fc.misses))
+        else:
+            winner = pop.run(pe.evaluate,n=ngenerations)
 
     # Save the winner.
     with open('winner_bell', 'wb') as f:
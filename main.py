@@ -8,16 +8,23 @@ Created on Thu Aug 29 10:03:56 2024
 
 import numpy as np
 
-from bell_physics import init_bell, init_physics
+from bell_physics import init_bell, init_physics, BellBatch
 
 import matplotlib.pyplot as plt
 import random
 
 class run_bell(object):
     
-    def __init__(self):
+    def __init__(self, record='full', record_length=3, seed=None, block=1024):
+        #record and record_length are passed on to init_bell, to set how much history it keeps
+        #seed is an int (or list of ints) or a numpy Generator, and all the random numbers for this run come from it.
+        #The per-tick coin flips are drawn block at a time, rather than one by one.
+        self.rng = np.random.default_rng(seed)
+        self.block = block
+        self.flips = np.zeros(0, dtype=bool)
+        self.flip_index = 0
         self.phy = init_physics()
-        self.bell = init_bell(self.phy, 0.0)
+        self.bell = init_bell(self.phy, 0.0, record=record, record_length=record_length)
         
         self.wheel_force = 600.   #max force on the rope (in Newtons)
         self.count = 0
@@ -29,8 +36,13 @@ class run_bell(object):
         self.bell.timestep(self.phy)
         self.phy.count = self.phy.count + 1
         
-        if random.random() > 0.5:
+        if self.flip_index == len(self.flips):
+            #Drawn lazily, so anything taken from rng before the first step (like the initial angle) comes first
+            self.flips = self.rng.random(self.block) > 0.5
+            self.flip_index = 0
+        if self.flips[self.flip_index]:
             self.bell.wheel_force = self.bell.effect_force*self.wheel_force
+        self.flip_index = self.flip_index + 1
             
         self.count = self.count + 1
         
@@ -39,6 +51,48 @@ class run_bell(object):
         """Angle then velocity (obviously veclotiy can be large)"""
         return [self.bell.bell_angle/(np.pi + self.bell.stay_angle), self.bell.velocity/(1.0)]
 
+class run_bell_batch(object):
+    #Same as run_bell, but runs n independent bells at once using BellBatch.
+    #Forces and states are arrays, with one entry (or row) per bell.
+    #seeds is a list of n ints or numpy Generators, one stream per bell. Bell i with seeds[i] draws the
+    #same coin flips as run_bell(seed=seeds[i]) with the same block size, so the two give the same runs.
+    
+    def __init__(self, n, seeds=None, block=1024):
+        if seeds is None:
+            seeds = [None]*n
+        if len(seeds) != n:
+            raise ValueError("Need one seed per bell, got %d for %d bells" % (len(seeds), n))
+        self.rngs = [np.random.default_rng(seed) for seed in seeds]
+        self.block = block
+        self.flips = np.zeros((0, n), dtype=bool)
+        self.flip_index = 0
+        self.phy = init_physics()
+        self.bell = BellBatch(self.phy, np.zeros(n))
+        
+        self.wheel_force = 600.   #max force on the rope (in Newtons)
+        self.count = 0
+        self.max_time = 120.
+        
+    def step(self, force):
+        #Does a single timestep on all the bells
+        self.bell.wheel_force = force*self.wheel_force 
+        self.bell.timestep(self.phy)
+        self.phy.count = self.phy.count + 1
+        
+        if self.flip_index == len(self.flips):
+            #One row per tick, one column per bell
+            self.flips = np.stack([rng.random(self.block) for rng in self.rngs], axis=1) > 0.5
+            self.flip_index = 0
+        override = self.flips[self.flip_index]
+        self.bell.wheel_force = np.where(override, self.bell.effect_force*self.wheel_force, self.bell.wheel_force)
+        self.flip_index = self.flip_index + 1
+            
+        self.count = self.count + 1
+        
+    def get_scaled_state(self):
+        """Get full system state for every bell, as an (n, 2) array of angle and velocity."""
+        return np.stack([self.bell.bell_angle/(np.pi + self.bell.stay_angle), self.bell.velocity/(1.0)], axis=1)
+
 def continuous_actuator_force(action):
     return action[0]
 
@@ -16,3 +16,13 @@ from neat.parallel import ParallelEvaluator
 from neat.distributed import DistributedEvaluator, host_is_local
 from neat.threaded import ThreadedEvaluator
 from neat.checkpoint import Checkpointer
+from neat.cache import PhenotypeCache, FitnessCache, genome_hash
+
+
+def __getattr__(name):
+    # NumPy is optional, so the classes that need it (here and in neat.nn, neat.ctrnn and
+    # neat.iznn) are imported when first asked for. Any import error then shows up there.
+    if name in ('ArraySpeciesSet', 'PrefilterSpeciesSet'):
+        import neat.distance
+        return getattr(neat.distance, name)
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -0,0 +1,111 @@
+"""
+Caches keyed by genome content, so that genomes which are unchanged from the last
+generation (elites, and clones from crossover of a genome with itself) need not
+have their networks rebuilt or their fitness evaluated again.
+"""
+import hashlib
+from collections import OrderedDict
+
+from neat.graphs import required_for_output
+
+
+def genome_hash(genome, genome_config):
+    """
+    Returns a hex digest of everything that affects a genome's network outputs: the
+    nodes required for the outputs and the enabled connections between them (and the
+    inputs), with all their gene attributes (weight, bias, response, activation,
+    aggregation, ...). The genome key and fitness are left out, so identical networks
+    from different genomes have the same hash, and the digest is the same in every process.
+    """
+    expressed = [cg for cg in genome.connections.values() if cg.enabled]
+    required = required_for_output(genome_config.input_keys, genome_config.output_keys,
+                                   [cg.key for cg in expressed])
+    pins = required.union(genome_config.input_keys)
+
+    parts = []
+    for key in sorted(required):
+        ng = genome.nodes[key]
+        parts.append(repr((key, [getattr(ng, a.name) for a in ng._gene_attributes])))
+    for cg in sorted(expressed, key=lambda cg: cg.key):
+        if cg.key[0] in pins and cg.key[1] in pins:
+            parts.append(repr((cg.key, [getattr(cg, a.name) for a in cg._gene_attributes])))
+
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+
+class PhenotypeCache(object):
+    """
+    A least-recently-used cache of networks, keyed by genome_hash. Use its create in
+    place of the network type's, e.g. PhenotypeCache(neat.nn.FeedForwardNetwork.create).
+    A cached network is handed out again as it is, so networks with state between
+    activations (RecurrentNetwork, CTRNN, IZNN) should be reset before use.
+
+    Kept at module level in an evaluation script, there is one cache per worker process
+    when evaluating with ParallelEvaluator, which lasts across generations.
+    """
+
+    def __init__(self, create, maxsize=1000):
+        self.create_network = create
+        self.maxsize = maxsize
+        self.networks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def create(self, genome, config):
+        key = genome_hash(genome, config.genome_config)
+        net = self.networks.get(key)
+        if net is None:
+            self.misses += 1
+            net = self.create_network(genome, config)
+            self.networks[key] = net
+            if len(self.networks) > self.maxsize:
+                self.networks.popitem(last=False)
+        else:
+            self.hits += 1
+            self.networks.move_to_end(key)
+
+        return net
+
+
+class FitnessCache(object):
+    """
+    Wraps an evaluation function taking (genomes, config), such as a serial eval_genomes
+    or ParallelEvaluator.evaluate, so that genomes whose genome_hash has been seen before
+    get their cached fitness instead of being evaluated again. Identical genomes within a
+    generation are evaluated once. The cache lives in the calling process.
+
+    Only valid when fitness depends on nothing but the network, e.g. when the evaluation
+    uses a fixed random seed. 'context' is anything else the fitness depends on (such as
+    the seed and run length); it is folded into the key, so changing it misses the cache.
+    """
+
+    def __init__(self, evaluate, maxsize=10000, context=None):
+        self.evaluate_function = evaluate
+        self.maxsize = maxsize
+        self.context = context
+        self.fitnesses = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, genomes, config):
+        unknown = OrderedDict()
+        for genome_id, genome in genomes:
+            key = (genome_hash(genome, config.genome_config), self.context)
+            if key in self.fitnesses:
+                self.hits += 1
+                self.fitnesses.move_to_end(key)
+                genome.fitness = self.fitnesses[key]
+            else:
+                unknown.setdefault(key, []).append((genome_id, genome))
+
+        self.misses += len(unknown)
+        if unknown:
+            self.evaluate_function([same[0] for same in unknown.values()], config)
+
+        for key, same in unknown.items():
+            fitness = same[0][1].fitness
+            for genome_id, genome in same[1:]:
+                genome.fitness = fitness
+            self.fitnesses[key] = fitness
+            if len(self.fitnesses) > self.maxsize:
+                self.fitnesses.popitem(last=False)
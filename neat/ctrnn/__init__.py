@@ -1,8 +1,58 @@
 """Handles the continuous-time recurrent neural network implementation."""
+import math
 
-
+from neat import activations
 from neat.graphs import required_for_output
 
+# Largest slope of each built-in activation function, for bounding how fast node values can
+# change (see max_time_step). inv, log, exp, square and cube have no useful bound and are
+# left out; they, and user-defined functions, are taken to have slope 1.
+activation_slopes = {activations.sigmoid_activation: 1.25,
+                     activations.tanh_activation: 2.5,
+                     activations.sin_activation: 5.0,
+                     activations.gauss_activation: math.sqrt(10.0 / math.e),
+                     activations.relu_activation: 1.0,
+                     activations.elu_activation: 1.0,
+                     activations.lelu_activation: 1.0,
+                     activations.selu_activation: 1.0507009873554804934193349852946 * 1.6732632423543772848170429916717,
+                     activations.softplus_activation: 1.0,
+                     activations.identity_activation: 1.0,
+                     activations.clamped_activation: 1.0,
+                     activations.abs_activation: 1.0,
+                     activations.hat_activation: 1.0}
+
+
+def max_time_step(node_evals, method='euler'):
+    """
+    Largest time step for which integrating the network is numerically stable, for a
+    dict of CTRNNNodeEvals. Each node i relaxes towards its activation at rate 1/tau_i,
+    and its activation changes at most gain_i = slope_i * |response_i| * sum_j |w_ij|
+    times as fast as the node values feeding it; by Gershgorin's theorem this bounds
+    the eigenvalues of the linearised system.
+
+    'euler' (forward Euler steps, as CTRNN.advance takes) is stable for
+        dt <= min_i 2 tau_i / (1 + gain_i).
+    'exponential' (exponential Euler, which solves the relaxation exactly) is stable for
+        dt <= min_i tau_i ln((gain_i + 1) / (gain_i - 1)),
+    with no limit from nodes whose gain is at most 1; so it may return infinity.
+
+    These are guides rather than guarantees once a gain exceeds 1: such networks can be
+    genuinely unstable, and CTRNN.advance updates each node from its value two steps back
+    (the other half of its double buffer), which can then drift whatever the time step.
+    """
+    if method not in ('euler', 'exponential'):
+        raise RuntimeError("Unknown CTRNN integration method {0!r}".format(method))
+
+    max_step = float('inf')
+    for ne in node_evals.values():
+        gain = activation_slopes.get(ne.activation, 1.0) * abs(ne.response) * sum(abs(w) for i, w in ne.links)
+        if method == 'euler':
+            max_step = min(max_step, 2.0 * ne.time_constant / (1.0 + gain))
+        elif gain > 1.0:
+            max_step = min(max_step, ne.time_constant * math.log((gain + 1.0) / (gain - 1.0)))
+
+    return max_step
+
 
 class CTRNNNodeEval(object):
     def __init__(self, time_constant, activation, aggregation, bias, response, links):
@@ -43,11 +93,9 @@ class CTRNN(object):
         for v in self.values:
             v[node_key] = value
 
-    def get_max_time_step(self):  # pragma: no cover
-        # TODO: Compute max time step that is known to be numerically stable for
-        # the current network configuration.
-        # pylint: disable=no-self-use
-        raise NotImplementedError()
+    def get_max_time_step(self):
+        """ Largest numerically stable time step for advance (see max_time_step). """
+        return max_time_step(self.node_evals)
 
     def advance(self, inputs, advance_time, time_step=None):
         """
@@ -57,7 +105,7 @@ class CTRNN(object):
         final_time_seconds = self.time_seconds + advance_time
 
         # Use half of the max allowed time step if none is given.
-        if time_step is None:  # pragma: no cover
+        if time_step is None:
             time_step = 0.5 * self.get_max_time_step()
 
         if len(self.input_nodes) != len(inputs):
@@ -119,3 +167,11 @@ class CTRNN(object):
                                                  inputs)
 
         return CTRNN(genome_config.input_keys, genome_config.output_keys, node_evals)
+
+
+def __getattr__(name):
+    # Needs NumPy (see neat.__getattr__).
+    if name == 'MatrixCTRNN':
+        from neat.ctrnn.matrix import MatrixCTRNN
+        return MatrixCTRNN
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -0,0 +1,102 @@
+"""Continuous-time recurrent networks integrated a whole state vector at a time with NumPy."""
+import numpy as np
+
+from neat.ctrnn import CTRNN, max_time_step
+from neat.nn.matrix import compile_layers, evaluate_layers
+
+
+class MatrixCTRNN(object):
+    """
+    An array-based CTRNN. With method='euler' it takes the same steps as CTRNN.advance,
+    to within floating-point rounding, including its double buffer: each node moves from
+    its value two steps back towards the activation of the previous step's values.
+    method='exponential' instead sets that value to
+        z + (value - z) * exp(-dt / tau),
+    which solves the relaxation exactly for fixed z, and so stays stable for much larger
+    steps (see get_max_time_step).
+    """
+
+    def __init__(self, inputs, outputs, node_evals, method='euler'):
+        if method not in ('euler', 'exponential'):
+            raise RuntimeError("Unknown CTRNN integration method {0!r}".format(method))
+
+        self.input_nodes = inputs
+        self.output_nodes = outputs
+        self.node_evals = node_evals
+        self.method = method
+
+        # Value vector order: inputs, outputs, evaluated nodes, then nodes only ever read from.
+        self.node_index = {}
+        for k in list(inputs) + list(outputs) + list(node_evals):
+            self.node_index.setdefault(k, len(self.node_index))
+        for ne in node_evals.values():
+            for i, w in ne.links:
+                self.node_index.setdefault(i, len(self.node_index))
+        self.input_index = np.array([self.node_index[k] for k in inputs], dtype=int)
+        self.output_index = np.array([self.node_index[k] for k in outputs], dtype=int)
+        self.nodes = np.array([self.node_index[k] for k in node_evals], dtype=int)
+        self.time_constants = np.array([ne.time_constant for ne in node_evals.values()], dtype=float)
+
+        # Every node is updated from the previous values, so all the node evals form one layer.
+        self.layers = compile_layers(self.node_index, [[(k, ne.activation, ne.aggregation, ne.bias, ne.response, ne.links)
+                                                        for k, ne in node_evals.items()]])
+
+        self.values = np.zeros((2, len(self.node_index)))
+        self.activations = np.zeros(len(self.node_index))
+        self.active = 0
+        self.time_seconds = 0.0
+
+    def reset(self):
+        self.values[:] = 0.0
+        self.active = 0
+        self.time_seconds = 0.0
+
+    def set_node_value(self, node_key, value):
+        self.values[:, self.node_index[node_key]] = value
+
+    def get_max_time_step(self):
+        """ Largest numerically stable time step for this network's method (see neat.ctrnn.max_time_step). """
+        return max_time_step(self.node_evals, self.method)
+
+    def advance(self, inputs, advance_time, time_step=None):
+        """
+        Advance the simulation by the given amount of time, assuming that inputs are
+        constant at the given values during the simulated time.
+        """
+        final_time_seconds = self.time_seconds + advance_time
+
+        # Use half of the max allowed time step if none is given.
+        if time_step is None:
+            time_step = 0.5 * self.get_max_time_step()
+
+        if len(self.input_nodes) != len(inputs):
+            raise RuntimeError("Expected {0} inputs, got {1}".format(len(self.input_nodes), len(inputs)))
+
+        nodes = self.nodes
+        while self.time_seconds < final_time_seconds:
+            dt = min(time_step, final_time_seconds - self.time_seconds)
+
+            ivalues = self.values[self.active]
+            ovalues = self.values[1 - self.active]
+            self.active = 1 - self.active
+
+            ivalues[self.input_index] = inputs
+            ovalues[self.input_index] = inputs
+
+            evaluate_layers(self.layers, ivalues, self.activations)
+            z = self.activations[nodes]
+            if self.method == 'euler':
+                ovalues[nodes] += dt / self.time_constants * (-ovalues[nodes] + z)
+            else:
+                ovalues[nodes] = z + (ovalues[nodes] - z) * np.exp(-dt / self.time_constants)
+
+            self.time_seconds += dt
+
+        ovalues = self.values[1 - self.active]
+        return ovalues[self.output_index].tolist()
+
+    @staticmethod
+    def create(genome, config, time_constant, method='euler'):
+        """ Receives a genome and returns its phenotype (a MatrixCTRNN). """
+        net = CTRNN.create(genome, config, time_constant)
+        return MatrixCTRNN(net.input_nodes, net.output_nodes, net.node_evals, method)
@@ -0,0 +1,547 @@
+"""
+Genomic distance computed with NumPy arrays of gene keys and attributes,
+rather than by walking each pair of genomes' gene dicts in Python.
+
+The distances are identical to DefaultGenome.distance, not just close: homologous
+genes are found by searching sorted key arrays, but their distance terms are
+computed with the same floating-point operations and added up in the same order.
+"""
+import numpy as np
+
+from neat.config import ConfigParameter, DefaultClassConfig
+from neat.genes import DefaultConnectionGene, DefaultNodeGene
+from neat.species import DefaultSpeciesSet
+
+# Integer codes for activation and aggregation names, so they compare as arrays.
+name_codes = {}
+
+
+def name_code(name):
+    code = name_codes.get(name)
+    if code is None:
+        code = name_codes[name] = len(name_codes)
+    return code
+
+
+def connection_key_codes(keys):
+    """
+    Packs (input, output) connection keys into single integers, in the same order
+    as the tuples sort. Node keys are assumed to fit in 32 bits.
+    """
+    keys = np.array(keys, dtype=np.int64).reshape(-1, 2)
+    return keys[:, 0] * (1 << 32) + keys[:, 1]
+
+
+class GeneArrays(object):
+    """
+    The genes of a list of genomes as flat parallel arrays, each genome's genes
+    in its own (dict) order: for nodes, the index of the genome, the key, bias, response
+    and activation and aggregation codes; for connections, the index of the genome,
+    the key, weight and enabled. For each kind of gene, order sorts the genes by key
+    (and genome), and sorted_keys holds the keys in that order, so all the genes with a
+    given key are found with searchsorted.
+    """
+
+    def __init__(self, genomes):
+        self.genome_keys = [g.key for g in genomes]
+
+        # One pass over each genome's genes, then one array per column.
+        nodes = [(n, ng.key, ng.bias, ng.response, ng.activation, ng.aggregation)
+                 for n, g in enumerate(genomes) for ng in g.nodes.values()]
+        genome, keys, bias, response, activation, aggregation = zip(*nodes) if nodes else ((),) * 6
+        self.node_genome = np.array(genome, dtype=int)
+        self.node_keys = np.array(keys, dtype=np.int64)
+        self.bias = np.array(bias, dtype=float)
+        self.response = np.array(response, dtype=float)
+        self.activation = np.array([name_code(name) for name in activation], dtype=int)
+        self.aggregation = np.array([name_code(name) for name in aggregation], dtype=int)
+        self.num_nodes = np.bincount(self.node_genome, minlength=len(genomes))
+        self.node_order = np.argsort(self.node_keys, kind='stable')
+        self.sorted_node_keys = self.node_keys[self.node_order]
+
+        connections = [(n, cg.key, cg.weight, cg.enabled)
+                       for n, g in enumerate(genomes) for cg in g.connections.values()]
+        genome, keys, weight, enabled = zip(*connections) if connections else ((),) * 4
+        self.connection_genome = np.array(genome, dtype=int)
+        self.connection_keys = connection_key_codes(keys)
+        self.weight = np.array(weight, dtype=float)
+        self.enabled = np.array(enabled, dtype=bool)
+        self.num_connections = np.bincount(self.connection_genome, minlength=len(genomes))
+        self.connection_order = np.argsort(self.connection_keys, kind='stable')
+        self.sorted_connection_keys = self.connection_keys[self.connection_order]
+
+    def node_attributes(self):
+        return self.bias, self.response, self.activation, self.aggregation
+
+    def connection_attributes(self):
+        return self.weight, self.enabled
+
+
+def homologous(keys, sorted_keys, order):
+    """
+    Pairs each of keys with every gene having the same key among sorted_keys. Returns,
+    for each pair, the position of the key in keys and of the gene in the other arrays,
+    ordered by the position in keys.
+    """
+    lo = np.searchsorted(sorted_keys, keys, side='left')
+    counts = np.searchsorted(sorted_keys, keys, side='right') - lo
+    position = np.repeat(np.arange(len(keys)), counts)
+    offset = np.arange(len(position)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return position, order[np.repeat(lo, counts) + offset]
+
+
+def node_gene_distances(attributes0, attributes1):
+    """ DefaultNodeGene.distance, before the weight coefficient, on arrays of (bias, response, activation, aggregation). """
+    bias0, response0, activation0, aggregation0 = attributes0
+    bias1, response1, activation1, aggregation1 = attributes1
+    d = np.abs(bias0 - bias1) + np.abs(response0 - response1)
+    d = d + (activation0 != activation1)
+    return d + (aggregation0 != aggregation1)
+
+
+def connection_gene_distances(attributes0, attributes1):
+    """ DefaultConnectionGene.distance, before the weight coefficient, on arrays of (weight, enabled). """
+    weight0, enabled0 = attributes0
+    weight1, enabled1 = attributes1
+    return np.abs(weight0 - weight1) + (enabled0 != enabled1)
+
+
+def gene_distance(total, homologous_genes, num0, num1, disjoint_coefficient):
+    """
+    Combines the summed distances of homologous genes and the counts of genes into
+    the node or connection part of the genome distance, as DefaultGenome.distance does.
+    """
+    disjoint = num0 + num1 - 2 * homologous_genes
+    largest = np.maximum(num0, num1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = (total + (disjoint_coefficient * disjoint)) / largest
+    return np.where(largest > 0, d, 0.0)
+
+
+def distances_from(arrays, table, config):
+    """
+    The genetic distances from the one genome in arrays (as self) to each genome
+    in table (another GeneArrays), as an array; the values DefaultGenome.distance
+    gives for genomes with the default gene types.
+    """
+    weight_coefficient = config.compatibility_weight_coefficient
+    disjoint_coefficient = config.compatibility_disjoint_coefficient
+    num_genomes = len(table.genome_keys)
+
+    # Compute node gene distance component. Homologous genes are paired in this genome's
+    # gene order, and bincount adds each genome's terms up in that order.
+    i, j = homologous(arrays.node_keys, table.sorted_node_keys, table.node_order)
+    d = node_gene_distances([a[i] for a in arrays.node_attributes()], [a[j] for a in table.node_attributes()])
+    genomes = table.node_genome[j]
+    total = np.bincount(genomes, weights=d * weight_coefficient, minlength=num_genomes)
+    node_distance = gene_distance(total, np.bincount(genomes, minlength=num_genomes),
+                                  len(arrays.node_keys), table.num_nodes, disjoint_coefficient)
+
+    # Compute connection gene differences.
+    i, j = homologous(arrays.connection_keys, table.sorted_connection_keys, table.connection_order)
+    d = connection_gene_distances([a[i] for a in arrays.connection_attributes()],
+                                  [a[j] for a in table.connection_attributes()])
+    genomes = table.connection_genome[j]
+    total = np.bincount(genomes, weights=d * weight_coefficient, minlength=num_genomes)
+    connection_distance = gene_distance(total, np.bincount(genomes, minlength=num_genomes),
+                                        len(arrays.connection_keys), table.num_connections,
+                                        disjoint_coefficient)
+
+    return node_distance + connection_distance
+
+
+def array_distance(arrays0, arrays1, config):
+    """ The genetic distance between two genomes, given the GeneArrays of each. """
+    return float(distances_from(arrays0, arrays1, config)[0])
+
+
+class GenePairs(object):
+    """
+    Finds homologous genes between given pairs of genomes of one GeneArrays, for one
+    kind of gene. The genes sorted by key are also sorted by genome within each key, so
+    (first position of the key, genome) codes increase along them and can be searched.
+    """
+
+    def __init__(self, gene_genome, keys, sorted_keys, order, num_genomes):
+        self.order = order
+        self.num = np.bincount(gene_genome, minlength=num_genomes)
+        self.start = np.cumsum(self.num) - self.num
+        self.num_genomes = num_genomes
+        # First position of each gene's key among the sorted keys, for genes in their own order.
+        self.first = np.searchsorted(sorted_keys, keys)
+        self.codes = np.searchsorted(sorted_keys, sorted_keys) * num_genomes + gene_genome[order]
+
+    def __call__(self, genomes0, genomes1):
+        """
+        For the pairs of genomes genomes0[k] and genomes1[k], returns for each homologous
+        gene the pair number k and the gene's positions in the first and second genome, in
+        pair order and then the first genome's gene order.
+        """
+        counts = self.num[genomes0]
+        pair = np.repeat(np.arange(len(genomes0)), counts)
+        position = (np.repeat(self.start[genomes0], counts) +
+                    np.arange(len(pair)) - np.repeat(np.cumsum(counts) - counts, counts))
+        code = self.first[position] * self.num_genomes + genomes1[pair]
+        found = np.minimum(np.searchsorted(self.codes, code), max(len(self.codes) - 1, 0))
+        if len(self.codes):
+            hit = self.codes[found] == code
+        else:
+            hit = np.zeros(len(code), dtype=bool)
+        return pair[hit], position[hit], self.order[found[hit]]
+
+
+def pair_distances(arrays, node_pairs, connection_pairs, genomes0, genomes1, config):
+    """
+    The genetic distances from each genome in genomes0 (as self) to the genome at the
+    same place in genomes1, all of them in arrays; as distances_from, one per pair.
+    """
+    weight_coefficient = config.compatibility_weight_coefficient
+    disjoint_coefficient = config.compatibility_disjoint_coefficient
+    num_pairs = len(genomes0)
+
+    pair, i, j = node_pairs(genomes0, genomes1)
+    d = node_gene_distances([a[i] for a in arrays.node_attributes()], [a[j] for a in arrays.node_attributes()])
+    total = np.bincount(pair, weights=d * weight_coefficient, minlength=num_pairs)
+    node_distance = gene_distance(total, np.bincount(pair, minlength=num_pairs),
+                                  arrays.num_nodes[genomes0], arrays.num_nodes[genomes1],
+                                  disjoint_coefficient)
+
+    pair, i, j = connection_pairs(genomes0, genomes1)
+    d = connection_gene_distances([a[i] for a in arrays.connection_attributes()],
+                                  [a[j] for a in arrays.connection_attributes()])
+    total = np.bincount(pair, weights=d * weight_coefficient, minlength=num_pairs)
+    connection_distance = gene_distance(total, np.bincount(pair, minlength=num_pairs),
+                                        arrays.num_connections[genomes0], arrays.num_connections[genomes1],
+                                        disjoint_coefficient)
+
+    return node_distance + connection_distance
+
+
+class GeneBins(object):
+    """
+    A fixed-length embedding of one kind of gene of each genome of a GeneArrays: the
+    counts of the genome's gene keys hashed into bins, written out as indicators of
+    "at least t genes in the bin" for t = 1, 2, ... so that the sum over bins of the
+    smaller of two genomes' counts is a dot product.
+    """
+
+    def __init__(self, gene_genome, keys, num_genomes, bins):
+        h = (keys >> 32) * 1000003 + (keys & 0xffffffff)
+        counts = np.bincount(gene_genome * bins + h % bins, minlength=num_genomes * bins).reshape(num_genomes, bins)
+        self.num = counts.sum(axis=1)
+        self.levels = np.hstack([np.zeros((num_genomes, 0), dtype=np.float32)] +
+                                [(counts >= t).astype(np.float32) for t in range(1, counts.max(initial=0) + 1)])
+
+    def bound(self, rows, columns, disjoint_coefficient):
+        """
+        A lower bound on the node or connection part of the distance between each genome of
+        rows and each of columns, as a (rows x columns) array. Genes with the same key fall in
+        the same bin, so no more genes are homologous than the bins' smaller counts add up to,
+        and the rest are disjoint.
+        """
+        shared = self.levels[rows].dot(self.levels[columns].T)
+        num0 = self.num[rows][:, np.newaxis]
+        num1 = self.num[columns][np.newaxis, :]
+        largest = np.maximum(num0, num1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d = (disjoint_coefficient * (num0 + num1 - 2 * shared)) / largest
+        return np.where(largest > 0, d, 0.0)
+
+
+class DistanceTable(object):
+    """
+    The distances from speciation representatives (rows) to the genomes of a population
+    (columns), computed a row at a time, each row in one call to distances_from. Rows are
+    added as representatives turn up, so the table grows only when a species is created.
+
+    As with GenomeDistanceCache, a distance between two genomes is computed once, the
+    way round it is first asked for, and that value is given both ways round after;
+    requested marks the entries asked for (each pair of genomes once).
+    """
+
+    def __init__(self, config, population):
+        self.config = config
+        self.table = GeneArrays(list(population.values()))
+        self.column = dict((gid, n) for n, gid in enumerate(population))
+        self.rows = {}
+        self.row_column = np.zeros(0, dtype=int)
+        self.column_row = np.full(len(population), -1, dtype=int)
+        self.distances = np.zeros((0, len(population)))
+        self.requested = np.zeros((0, len(population)), dtype=bool)
+
+    def row(self, genome):
+        """ Returns the row of distances from genome, adding it if needed. """
+        row = self.rows.get(genome.key)
+        if row is None:
+            row = len(self.rows)
+            if row == len(self.distances):
+                # Grow by doubling, so adding rows one at a time stays cheap.
+                extra = max(row, 8)
+                self.distances = np.vstack([self.distances, np.zeros((extra, self.distances.shape[1]))])
+                self.requested = np.vstack([self.requested, np.zeros((extra, self.requested.shape[1]), dtype=bool)])
+                self.row_column = np.concatenate([self.row_column, np.full(extra, -1, dtype=int)])
+            self.distances[row] = distances_from(genome.gene_arrays(), self.table, self.config)
+            self.rows[genome.key] = row
+            column = self.column.get(genome.key)
+            if column is not None:
+                self.row_column[row] = column
+                self.column_row[column] = row
+        return row
+
+    def lookup(self, rows, columns):
+        """
+        The distances from the genomes of rows to those of columns (arrays of row and
+        column numbers, broadcast against each other), without marking them as asked for.
+        """
+        rows, columns = np.broadcast_arrays(rows, columns)
+        d = self.distances[rows, columns]
+
+        # Pairs already asked for the other way round keep the value computed then.
+        swapped_rows = self.column_row[columns]
+        swapped_columns = self.row_column[rows]
+        swapped = (swapped_rows >= 0) & (swapped_columns >= 0)
+        swapped[swapped] = self.requested[swapped_rows[swapped], swapped_columns[swapped]]
+        d[swapped] = self.distances[swapped_rows[swapped], swapped_columns[swapped]]
+        return d, swapped
+
+    def __call__(self, rows, columns):
+        """ As lookup, but marks the distances as asked for. """
+        d, swapped = self.lookup(rows, columns)
+        rows, columns = np.broadcast_arrays(rows, columns)
+        self.requested[rows[~swapped], columns[~swapped]] = True
+        return d
+
+    def requested_distances(self):
+        """ The distances asked for, each pair of genomes once. """
+        return self.distances[:len(self.rows)][self.requested[:len(self.rows)]]
+
+
+class ArraySpeciesSet(DefaultSpeciesSet):
+    """
+    The default speciation scheme, computed with a DistanceTable: each genome is compared
+    with every representative at once, as a column of the table. Gives the same species
+    as DefaultSpeciesSet, but keeps no distances from one generation to the next. Genomes
+    with other gene types are speciated as DefaultSpeciesSet does.
+    """
+
+    # Genomes compared with the representatives at once (at most; a chunk stops at a new species).
+    chunk_size = 64
+
+    def speciate(self, config, population, generation):
+        genome_config = config.genome_config
+        if (genome_config.node_gene_type is not DefaultNodeGene or
+                genome_config.connection_gene_type is not DefaultConnectionGene):
+            return DefaultSpeciesSet.speciate(self, config, population, generation)
+
+        assert isinstance(population, dict)
+
+        compatibility_threshold = self.species_set_config.compatibility_threshold
+
+        # Columns in the order the set of unspeciated genomes iterates, which removing
+        # genomes from it does not change.
+        unspeciated = set(population)
+        distances = DistanceTable(genome_config, population)
+        order = np.array([distances.column[gid] for gid in unspeciated], dtype=int)
+        remaining = np.ones(len(population), dtype=bool)
+
+        # Find the best representatives for each existing species.
+        new_representatives = {}
+        new_members = {}
+        for sid, s in self.species.items():
+            candidates = order[remaining[order]]
+            d = distances(distances.row(s.representative), candidates)
+
+            # The new representative is the genome closest to the current representative.
+            column = candidates[np.argmin(d)]
+            new_rid = distances.table.genome_keys[column]
+            new_representatives[sid] = new_rid
+            new_members[sid] = [new_rid]
+            unspeciated.remove(new_rid)
+            remaining[column] = False
+
+        # Partition population into species based on genetic similarity, in the order
+        # DefaultSpeciesSet pops the genomes. Each chunk of genomes is compared with every
+        # representative at once, up to the first genome needing a new species.
+        species_ids = list(new_representatives)
+        rows = np.array([distances.row(population[rid]) for rid in new_representatives.values()], dtype=int)
+        columns = []
+        while unspeciated:
+            columns.append(distances.column[unspeciated.pop()])
+        columns = np.array(columns, dtype=int)
+        start = 0
+        while start < len(columns):
+            chunk = columns[start:start + self.chunk_size]
+            d, ignored_swapped = distances.lookup(rows[:, np.newaxis], chunk)
+            d = np.where(d < compatibility_threshold, d, np.inf)
+            unmatched = np.flatnonzero(np.all(d == np.inf, axis=0))
+            end = unmatched[0] if len(unmatched) else len(chunk)
+
+            # Find the species with the most similar representative.
+            distances(rows[:, np.newaxis], chunk[:end + 1])
+            if end:
+                for column, best in zip(chunk[:end], np.argmin(d[:, :end], axis=0)):
+                    new_members[species_ids[best]].append(distances.table.genome_keys[column])
+
+            if end < len(chunk):
+                # No species is similar enough, create a new species, using
+                # this genome as its representative.
+                gid = distances.table.genome_keys[chunk[end]]
+                sid = next(self.indexer)
+                new_representatives[sid] = gid
+                new_members[sid] = [gid]
+                species_ids.append(sid)
+                rows = np.append(rows, distances.row(population[gid]))
+                end += 1
+            start += end
+
+        self.update_species(population, generation, new_representatives, new_members)
+
+        # Mean and std genetic distance info report (no distances are kept from earlier
+        # generations, so all of those asked for were computed this generation)
+        if self.species_set_config.distance_report and len(population) > 1:
+            d = distances.requested_distances()
+            self.report_distances(len(d), np.mean(d), np.std(d))
+
+
+class PrefilterSpeciesSet(ArraySpeciesSet):
+    """
+    Speciation for very large populations with many species. Each genome's node and
+    connection genes are embedded as GeneBins of embedding_bins bins, which give a lower
+    bound on the distance between two genomes. A genome is only compared exactly with the
+    representatives whose bound is under the compatibility threshold, and a species' new
+    representative is searched for in order of the bound, stopping once the bound passes
+    the closest distance found. The more bins there are for the genes of a genome, the fewer
+    keys share a bin and the closer the bound is.
+
+    The bound never rules out a genome that could be chosen, so the species are the same as
+    ArraySpeciesSet's (except that each distance is computed from the representative's side,
+    where GenomeDistanceCache may reuse one computed the other way round, which can differ
+    in the last bit). The distance report covers only the distances computed.
+    """
+
+    # The bound is scaled down by this much, so that rounding can never put it above
+    # the exact distance.
+    bound_margin = 1e-9
+
+    @classmethod
+    def parse_config(cls, param_dict):
+        return DefaultClassConfig(param_dict,
+                                  [ConfigParameter('compatibility_threshold', float),
+                                   ConfigParameter('distance_report', bool, True),
+                                   ConfigParameter('embedding_bins', int, 64)])
+
+    def speciate(self, config, population, generation):
+        genome_config = config.genome_config
+        if (genome_config.node_gene_type is not DefaultNodeGene or
+                genome_config.connection_gene_type is not DefaultConnectionGene):
+            return DefaultSpeciesSet.speciate(self, config, population, generation)
+
+        assert isinstance(population, dict)
+
+        compatibility_threshold = self.species_set_config.compatibility_threshold
+        disjoint_coefficient = genome_config.compatibility_disjoint_coefficient
+        bins = self.species_set_config.embedding_bins
+
+        # The population, followed by the representatives from the last generation which
+        # are no longer in it.
+        genomes = list(population.values())
+        genomes += [s.representative for s in self.species.values() if s.representative.key not in population]
+        index = dict((g.key, n) for n, g in enumerate(genomes))
+        arrays = GeneArrays(genomes)
+        node_pairs = GenePairs(arrays.node_genome, arrays.node_keys, arrays.sorted_node_keys,
+                               arrays.node_order, len(genomes))
+        connection_pairs = GenePairs(arrays.connection_genome, arrays.connection_keys,
+                                     arrays.sorted_connection_keys, arrays.connection_order, len(genomes))
+        node_bins = GeneBins(arrays.node_genome, arrays.node_keys, len(genomes), bins)
+        connection_bins = GeneBins(arrays.connection_genome, arrays.connection_keys, len(genomes), bins)
+        computed = []
+
+        def bound(rows, columns):
+            d = node_bins.bound(rows, columns, disjoint_coefficient)
+            d = d + connection_bins.bound(rows, columns, disjoint_coefficient)
+            return d * (1.0 - self.bound_margin)
+
+        def exact(rows, columns):
+            d = pair_distances(arrays, node_pairs, connection_pairs, rows, columns, genome_config)
+            computed.append(d)
+            return d
+
+        def close(rows, columns):
+            # Distances under the threshold, and inf for the rest, computing only those
+            # the bound does not rule out.
+            rows = np.asarray(rows, dtype=int)
+            d = np.full((len(rows), len(columns)), np.inf)
+            r, c = np.nonzero(bound(rows, columns) < compatibility_threshold)
+            d[r, c] = exact(rows[r], columns[c])
+            return np.where(d < compatibility_threshold, d, np.inf)
+
+        # Find the best representatives for each existing species.
+        unspeciated = set(population)
+        order = np.array([index[gid] for gid in unspeciated], dtype=int)
+        remaining = np.ones(len(genomes), dtype=bool)
+        new_representatives = {}
+        new_members = {}
+        old_rows = [index[s.representative.key] for s in self.species.values()]
+        old_bounds = bound(old_rows, np.arange(len(genomes)))
+        for (sid, s), row, lower in zip(self.species.items(), old_rows, old_bounds):
+            candidates = order[remaining[order]]
+            lower = lower[candidates]
+            d = np.full(len(candidates), np.inf)
+            best = np.inf
+            by_bound = np.argsort(lower, kind='stable')
+            for start in range(0, len(by_bound), self.chunk_size):
+                block = by_bound[start:start + self.chunk_size]
+                if lower[block[0]] > best:
+                    break
+                d[block] = exact(np.full(len(block), row), candidates[block])
+                best = min(best, d[block].min())
+
+            # The new representative is the genome closest to the current representative.
+            column = candidates[np.argmin(d)]
+            new_rid = genomes[column].key
+            new_representatives[sid] = new_rid
+            new_members[sid] = [new_rid]
+            unspeciated.remove(new_rid)
+            remaining[column] = False
+
+        # Partition population into species based on genetic similarity, in the order
+        # DefaultSpeciesSet pops the genomes, a chunk of genomes at a time.
+        species_ids = list(new_representatives)
+        rows = [index[rid] for rid in new_representatives.values()]
+        columns = []
+        while unspeciated:
+            columns.append(index[unspeciated.pop()])
+        columns = np.array(columns, dtype=int)
+        for start in range(0, len(columns), self.chunk_size):
+            chunk = columns[start:start + self.chunk_size]
+            d = close(rows, chunk)
+            j = 0
+            while j < len(chunk):
+                unmatched = np.flatnonzero(np.all(d[:, j:] == np.inf, axis=0))
+                end = j + unmatched[0] if len(unmatched) else len(chunk)
+
+                # Find the species with the most similar representative.
+                if end > j:
+                    for column, best in zip(chunk[j:end], np.argmin(d[:, j:end], axis=0)):
+                        new_members[species_ids[best]].append(genomes[column].key)
+
+                if end < len(chunk):
+                    # No species is similar enough, create a new species, using
+                    # this genome as its representative.
+                    gid = genomes[chunk[end]].key
+                    sid = next(self.indexer)
+                    new_representatives[sid] = gid
+                    new_members[sid] = [gid]
+                    species_ids.append(sid)
+                    rows.append(chunk[end])
+                    new_row = np.full((1, len(chunk)), np.inf)
+                    new_row[:, end + 1:] = close([chunk[end]], chunk[end + 1:])
+                    d = np.vstack([d, new_row])
+                j = end + 1
+
+        self.update_species(population, generation, new_representatives, new_members)
+
+        # Mean and std genetic distance info report
+        d = np.concatenate(computed) if computed else np.zeros(0)
+        if self.species_set_config.distance_report and len(d):
+            self.report_distances(len(d), np.mean(d), np.std(d))
@@ -152,6 +152,13 @@ class DefaultGenome(object):
         4. The input values are applied to the input pins unmodified.
     """
 
+    # Index of which nodes each connection gene joins (see connection_index). Built when first
+    # needed and then kept up to date as connections are added and deleted. Class-level defaults,
+    # so genomes pickled before the index existed still load.
+    _outgoing = None
+    _incoming = None
+    _num_indexed = 0
+
     @classmethod
     def parse_config(cls, param_dict):
         param_dict['node_gene_type'] = DefaultNodeGene
@@ -261,6 +268,57 @@ class DefaultGenome(object):
                 # Homologous gene: combine genes from both parents.
                 self.nodes[key] = ng1.crossover(ng2)
 
+    def connection_index(self):
+        """
+        Returns (outgoing, incoming): dicts mapping each node to the set of nodes its
+        connection genes (enabled or not) lead to, and come from. Rebuilt from scratch
+        if the number of connections no longer matches the index, as happens when
+        self.connections is edited directly rather than through the genome's methods.
+
+        The count is the only check, so an edit to self.connections that leaves the count
+        the same (replacing one key with another, say) goes unnoticed. Code that edits
+        self.connections directly like that must call index_connection and
+        unindex_connection, or drop the index with clear_connection_index.
+        """
+        if self._outgoing is None or self._num_indexed != len(self.connections):
+            self._outgoing = {}
+            self._incoming = {}
+            for i, o in self.connections:
+                self._outgoing.setdefault(i, set()).add(o)
+                self._incoming.setdefault(o, set()).add(i)
+            self._num_indexed = len(self.connections)
+
+        return self._outgoing, self._incoming
+
+    def clear_connection_index(self):
+        """ Drops the index, so that connection_index rebuilds it when next needed. """
+        self._outgoing = None
+        self._incoming = None
+        self._num_indexed = 0
+
+    def __getstate__(self):
+        # The index is rebuilt when needed, so it is not pickled (or copied).
+        state = self.__dict__.copy()
+        for name in ('_outgoing', '_incoming', '_num_indexed'):
+            state.pop(name, None)
+        return state
+
+    def index_connection(self, key):
+        """ Records a connection just added to self.connections in the index, if there is one. """
+        if self._outgoing is not None and self._num_indexed + 1 == len(self.connections):
+            i, o = key
+            self._outgoing.setdefault(i, set()).add(o)
+            self._incoming.setdefault(o, set()).add(i)
+            self._num_indexed = len(self.connections)
+
+    def unindex_connection(self, key):
+        """ Drops a connection just deleted from self.connections from the index, if there is one. """
+        if self._outgoing is not None and self._num_indexed - 1 == len(self.connections):
+            i, o = key
+            self._outgoing[i].discard(o)
+            self._incoming[o].discard(i)
+            self._num_indexed = len(self.connections)
+
     def mutate(self, config):
         """ Mutates this genome. """
 
@@ -331,7 +389,10 @@ class DefaultGenome(object):
         connection.init_attributes(config)
         connection.weight = weight
         connection.enabled = enabled
+        is_new = key not in self.connections
         self.connections[key] = connection
+        if is_new:
+            self.index_connection(key)
 
     def mutate_add_connection(self, config):
         """
@@ -360,11 +421,12 @@ class DefaultGenome(object):
         # they cannot be the output end of a connection (see above).
 
         # For feed-forward networks, avoid creating cycles.
-        if config.feed_forward and creates_cycle(list(self.connections), key):
+        if config.feed_forward and creates_cycle(None, key, self.connection_index()[0]):
             return
 
         cg = self.create_connection(config, in_node, out_node)
         self.connections[cg.key] = cg
+        self.index_connection(cg.key)
 
     def mutate_delete_node(self, config):
         # Do nothing if there are no non-output nodes.
@@ -374,13 +436,13 @@ class DefaultGenome(object):
 
         del_key = choice(available_nodes)
 
-        connections_to_delete = set()
-        for k, v in self.connections.items():
-            if del_key in v.key:
-                connections_to_delete.add(v.key)
+        outgoing, incoming = self.connection_index()
+        connections_to_delete = set((del_key, o) for o in outgoing.get(del_key, ()))
+        connections_to_delete.update((i, del_key) for i in incoming.get(del_key, ()))
 
         for key in connections_to_delete:
             del self.connections[key]
+            self.unindex_connection(key)
 
         del self.nodes[del_key]
 
@@ -390,6 +452,7 @@ class DefaultGenome(object):
         if self.connections:
             key = choice(list(self.connections.keys()))
             del self.connections[key]
+            self.unindex_connection(key)
 
     def distance(self, other, config):
         """
@@ -442,6 +505,14 @@ class DefaultGenome(object):
         distance = node_distance + connection_distance
         return distance
 
+    def gene_arrays(self):
+        """
+        Returns the genes as a neat.distance.GeneArrays: sorted key arrays and parallel
+        attribute arrays, from which distances can be computed without walking the gene dicts.
+        """
+        from neat.distance import GeneArrays
+        return GeneArrays([self])
+
     def size(self):
         """
         Returns genome 'complexity', taken to be
@@ -1,28 +1,36 @@
 """Directed graph algorithm implementations."""
 
 
-def creates_cycle(connections, test):
+def creates_cycle(connections, test, successors=None):
     """
     Returns true if the addition of the 'test' connection would create a cycle,
     assuming that no cycle already exists in the graph represented by 'connections'.
+    If given, 'successors' maps each node to the nodes its connections lead to, and is
+    used instead of 'connections' (which may then be None), so the test only visits
+    the part of the graph reachable from the new connection.
     """
     i, o = test
     if i == o:
         return True
 
-    visited = {o}
-    while True:
-        num_added = 0
+    # Depth-first search for a path from o back to i.
+    if successors is None:
+        successors = {}
         for a, b in connections:
-            if a in visited and b not in visited:
+            successors.setdefault(a, []).append(b)
+
+    visited = {o}
+    stack = [o]
+    while stack:
+        for b in successors.get(stack.pop(), ()):
+            if b not in visited:
                 if b == i:
                     return True
 
                 visited.add(b)
-                num_added += 1
+                stack.append(b)
 
-        if num_added == 0:
-            return False
+    return False
 
 
 def required_for_output(inputs, outputs, connections):
@@ -38,11 +46,20 @@ def required_for_output(inputs, outputs, connections):
     """
     assert not set(inputs).intersection(outputs)
 
+    inputs = set(inputs)
+    predecessors = {}
+    for a, b in connections:
+        predecessors.setdefault(b, []).append(a)
+
+    # Breadth-first search back from the outputs, one layer at a time,
+    # stopping at the first layer that holds nothing but input nodes.
     required = set(outputs)
     s = set(outputs)
+    frontier = s
     while 1:
         # Find nodes not in s whose output is consumed by a node in s.
-        t = set(a for (a, b) in connections if b in s and a not in s)
+        # (Anything feeding an older member of s was already added along with it.)
+        t = set(a for b in frontier for a in predecessors.get(b, ()) if a not in s)
 
         if not t:
             break
@@ -53,6 +70,7 @@ def required_for_output(inputs, outputs, connections):
 
         required = required.union(layer_nodes)
         s = s.union(t)
+        frontier = t
 
     return required
 
@@ -68,25 +86,32 @@ def feed_forward_layers(inputs, outputs, connections):
     Note that the returned layers do not contain nodes whose output is ultimately
     never used to compute the final network output.
     """
-
+    connections = list(connections)
     required = required_for_output(inputs, outputs, connections)
 
-    layers = []
+    # Kahn's algorithm: count each node's inputs from outside s, and a node joins
+    # the next layer once that count reaches zero.
     s = set(inputs)
-    while 1:
-        # Find candidate nodes c for the next layer.  These nodes should connect
-        # a node in s to a node not in s.
-        c = set(b for (a, b) in connections if a in s and b not in s)
-        # Keep only the used nodes whose entire input set is contained in s.
-        t = set()
-        for n in c:
-            if n in required and all(a in s for (a, b) in connections if b == n):
-                t.add(n)
+    successors = {}
+    waiting = {}
+    for a, b in connections:
+        successors.setdefault(a, []).append(b)
+        if a not in s:
+            waiting[b] = waiting.get(b, 0) + 1
 
-        if not t:
-            break
+    # Candidates for the first layer are fed only by inputs (and by at least one of them).
+    t = set(b for a, b in connections if a in s and b not in s and b in required and not waiting.get(b))
 
+    layers = []
+    while t:
         layers.append(t)
         s = s.union(t)
+        c = set()
+        for a in t:
+            for b in successors.get(a, ()):
+                waiting[b] -= 1
+                if not waiting[b] and b in required and b not in s:
+                    c.add(b)
+        t = c
 
     return layers
@@ -198,3 +198,11 @@ class IZNN(object):
 
         genome_config = config.genome_config
         return IZNN(neurons, genome_config.input_keys, genome_config.output_keys)
+
+
+def __getattr__(name):
+    # Needs NumPy (see neat.__getattr__).
+    if name == 'MatrixIZNN':
+        from neat.iznn.matrix import MatrixIZNN
+        return MatrixIZNN
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -0,0 +1,108 @@
+"""
+Izhikevich spiking networks simulated with NumPy, as arrays of neuron state
+rather than one IZNeuron object at a time.
+"""
+import numpy as np
+
+from neat.iznn import IZNN
+
+
+class MatrixIZNN(object):
+    """
+    An array-based IZNN: v, u, a, b, c, d and bias are vectors over the neurons, and the
+    connections are two weight matrices, one from the neurons and one from the inputs.
+    Each step computes every neuron's current from the spikes of the previous step, then
+    advances every neuron, as IZNN.advance does.
+
+    Instead of catching OverflowError neuron by neuron, any neuron whose v or u is no
+    longer finite after the update is reset without a spike, as IZNeuron does on overflow.
+
+    If trials is given, that many independent copies of the network are run side by side:
+    set_inputs then takes a (trials, inputs) array, and advance returns a (trials, outputs)
+    array of spikes.
+    """
+
+    def __init__(self, neurons, inputs, outputs, trials=None):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.trials = trials
+
+        self.neuron_keys = list(neurons)
+        neuron_index = dict((k, n) for n, k in enumerate(self.neuron_keys))
+        input_index = dict((k, n) for n, k in enumerate(inputs))
+        self.output_index = np.array([neuron_index[k] for k in outputs], dtype=int)
+
+        # Parameters are columns when running several trials, so they broadcast across them.
+        shape = (len(neurons),) if trials is None else (len(neurons), 1)
+        self.bias = np.array([n.bias for n in neurons.values()], dtype=float).reshape(shape)
+        self.a = np.array([n.a for n in neurons.values()], dtype=float).reshape(shape)
+        self.b = np.array([n.b for n in neurons.values()], dtype=float).reshape(shape)
+        self.c = np.array([n.c for n in neurons.values()], dtype=float).reshape(shape)
+        self.d = np.array([n.d for n in neurons.values()], dtype=float).reshape(shape)
+
+        self.neuron_weights = np.zeros((len(neurons), len(neurons)))
+        self.input_weights = np.zeros((len(neurons), len(inputs)))
+        for n, neuron in enumerate(neurons.values()):
+            for i, w in neuron.inputs:
+                if i in neuron_index:
+                    self.neuron_weights[n, neuron_index[i]] += w
+                else:
+                    self.input_weights[n, input_index[i]] += w
+
+        self.input_values = np.zeros((len(inputs),) if trials is None else (len(inputs), trials))
+        self.reset()
+
+    def set_inputs(self, inputs):
+        """Assign input voltages (a (trials, inputs) array when running several trials)."""
+        if self.trials is None:
+            if len(inputs) != len(self.inputs):
+                raise RuntimeError(
+                    "Number of inputs {0:d} does not match number of input nodes {1:d}".format(
+                        len(inputs), len(self.inputs)))
+            self.input_values[:] = inputs
+        else:
+            inputs = np.asarray(inputs, dtype=float)
+            if inputs.shape != (self.trials, len(self.inputs)):
+                raise RuntimeError("Expected a {0!r} array of inputs, got shape {1!r}".format(
+                    (self.trials, len(self.inputs)), inputs.shape))
+            self.input_values[:] = inputs.T
+
+    def reset(self):
+        """Reset all neurons to their default state."""
+        shape = (len(self.neuron_keys),) if self.trials is None else (len(self.neuron_keys), self.trials)
+        self.v = np.broadcast_to(self.c, shape).copy()
+        self.u = self.b * self.v
+        self.fired = np.zeros(shape)
+        self.current = np.broadcast_to(self.bias, shape).copy()
+
+    def get_time_step_msec(self):
+        return 0.05
+
+    def advance(self, dt_msec):
+        self.current = self.bias + self.neuron_weights.dot(self.fired) + self.input_weights.dot(self.input_values)
+
+        with np.errstate(over='ignore', invalid='ignore'):
+            v = self.v + 0.5 * dt_msec * (0.04 * self.v ** 2 + 5 * self.v + 140 - self.u + self.current)
+            v = v + 0.5 * dt_msec * (0.04 * v ** 2 + 5 * v + 140 - self.u + self.current)
+            u = self.u + dt_msec * self.a * (self.b * v - self.u)
+
+            # Reset without producing a spike.
+            overflow = ~(np.isfinite(v) & np.isfinite(u))
+            v = np.where(overflow, self.c, v)
+            u = np.where(overflow, self.b * self.c, u)
+
+            # Output spike and reset.
+            fired = v > 30.0
+            self.v = np.where(fired, self.c, v)
+            self.u = np.where(fired, u + self.d, u)
+            self.fired = fired.astype(float)
+
+        if self.trials is None:
+            return self.fired[self.output_index].tolist()
+        return self.fired[self.output_index].T
+
+    @staticmethod
+    def create(genome, config, trials=None):
+        """ Receives a genome and returns its phenotype (a MatrixIZNN). """
+        net = IZNN.create(genome, config)
+        return MatrixIZNN(net.neurons, net.inputs, net.outputs, trials)
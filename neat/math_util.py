@@ -46,6 +46,30 @@ def softmax(values):
     return [ev * inv_s for ev in e_values]
 
 
+class RunningStatistics(object):
+    """
+    Count, mean and variance of values seen one at a time, without keeping them
+    (Welford's method). variance and stdev match the functions above.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.squares = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.squares += delta * (value - self.mean)
+
+    def variance(self):
+        return self.squares / self.count
+
+    def stdev(self):
+        return sqrt(self.variance())
+
+
 # Lookup table for commonly used {value} -> value functions.
 stat_functions = {'min': min, 'max': max, 'mean': mean, 'median': median,
                   'median2': median2}
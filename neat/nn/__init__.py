@@ -1,2 +1,11 @@
 from neat.nn.feed_forward import FeedForwardNetwork
 from neat.nn.recurrent import RecurrentNetwork
+from neat.nn.compiled import CompiledFeedForwardNetwork
+
+
+def __getattr__(name):
+    # Needs NumPy (see neat.__getattr__).
+    if name in ('MatrixFeedForwardNetwork', 'MatrixRecurrentNetwork'):
+        import neat.nn.matrix
+        return getattr(neat.nn.matrix, name)
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -0,0 +1,122 @@
+"""
+Feed-forward networks compiled to straight-line Python functions.
+
+Each node becomes one assignment to a local variable, with the common activation
+functions written out inline and sum aggregation a direct call to sum() on a tuple,
+so activating the network does no dict lookups, tuple unpacking or list building.
+The outputs are the same as FeedForwardNetwork's on every Python version.
+"""
+import math
+from functools import lru_cache
+
+from neat import activations, aggregations
+from neat.nn.feed_forward import FeedForwardNetwork
+
+# Activation functions written out inline; z is the expression for the node's input.
+inline_activations = {
+    activations.sigmoid_activation: '1.0 / (1.0 + exp(-max(-60.0, min(60.0, 5.0 * {z}))))',
+    activations.tanh_activation: 'tanh(max(-60.0, min(60.0, 2.5 * {z})))',
+    activations.sin_activation: 'sin(max(-60.0, min(60.0, 5.0 * {z})))',
+    activations.relu_activation: '{z} if {z} > 0.0 else 0.0',
+    activations.identity_activation: '{z}',
+    activations.clamped_activation: 'max(-1.0, min(1.0, {z}))',
+    activations.abs_activation: 'abs({z})',
+}
+
+
+def literal(x):
+    """Source for a float that reads back as exactly the same float."""
+    x = float(x)
+    return repr(x) if math.isfinite(x) else "float('{0!r}')".format(x)
+
+
+def variable(node):
+    """Name of the local variable holding a node's value (node keys may be negative)."""
+    return 'n{0}'.format(node) if node >= 0 else 'm{0}'.format(-node)
+
+
+def generate_source(inputs, outputs, node_evals):
+    """
+    Returns the source of a function activate(inputs) evaluating the node evals
+    (as in FeedForwardNetwork.node_evals) in order, and the functions it calls
+    by name, as a dict.
+    """
+    functions = {}
+    names = {}
+
+    def call(function):
+        if function not in names:
+            names[function] = 'f{0}'.format(len(names))
+            functions[names[function]] = function
+        return names[function]
+
+    lines = ['def activate(inputs):',
+             '    if len(inputs) != {0:n}:'.format(len(inputs)),
+             '        raise RuntimeError("Expected {0:n} inputs, got {{0:n}}".format(len(inputs)))'.format(len(inputs))]
+    if inputs:
+        lines.append('    {0}, = inputs'.format(', '.join(variable(i) for i in inputs)))
+
+    evaluated = set(inputs)
+    for node, act_func, agg_func, bias, response, links in node_evals:
+        terms = ['{0} * {1}'.format(variable(i), literal(w)) for i, w in links]
+        if agg_func is aggregations.sum_aggregation:
+            # Through sum() itself, not written out as a + b + ..., since from Python 3.12
+            # sum() adds floats with compensated summation.
+            s = 'sum(({0},))'.format(', '.join(terms)) if terms else '0'
+        else:
+            s = '{0}([{1}])'.format(call(agg_func), ', '.join(terms))
+        z = variable(node)
+        lines.append('    {0} = {1} + {2} * ({3})'.format(z, literal(bias), literal(response), s))
+        if act_func in inline_activations:
+            lines.append('    {0} = {1}'.format(z, inline_activations[act_func].format(z=z)))
+        else:
+            lines.append('    {0} = {1}({0})'.format(z, call(act_func)))
+        evaluated.add(node)
+
+    # Outputs that never get evaluated stay at 0.0, as in FeedForwardNetwork.
+    lines.append('    return [{0}]'.format(', '.join(variable(o) if o in evaluated else '0.0' for o in outputs)))
+
+    return '\n'.join(lines) + '\n', functions
+
+
+@lru_cache(maxsize=1024)
+def build(source, functions):
+    """
+    Executes generated source, given the functions it calls as a tuple of
+    (name, function) pairs, and returns the activate function. Cached, so
+    identical networks share one function.
+    """
+    namespace = {'exp': math.exp, 'tanh': math.tanh, 'sin': math.sin}
+    namespace.update(functions)
+    exec(compile(source, '<neat compiled network>', 'exec'), namespace)
+    return namespace['activate']
+
+
+class CompiledFeedForwardNetwork(object):
+    """
+    A feed-forward network as a generated straight-line function. Pickles as its
+    source (and the functions that source calls), which is executed again on loading.
+    """
+
+    def __init__(self, inputs, outputs, source, functions):
+        self.input_nodes = inputs
+        self.output_nodes = outputs
+        self.source = source
+        self.functions = functions
+        self.activate = build(source, tuple(sorted(functions.items())))
+
+    def __getstate__(self):
+        return self.input_nodes, self.output_nodes, self.source, self.functions
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    @staticmethod
+    def from_node_evals(inputs, outputs, node_evals):
+        source, functions = generate_source(inputs, outputs, node_evals)
+        return CompiledFeedForwardNetwork(inputs, outputs, source, functions)
+
+    @staticmethod
+    def create(genome, config):
+        """ Receives a genome and returns its phenotype (a CompiledFeedForwardNetwork). """
+        return FeedForwardNetwork.create(genome, config).compile()
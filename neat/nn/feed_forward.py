@@ -2,6 +2,9 @@ from neat.graphs import feed_forward_layers
 
 
 class FeedForwardNetwork(object):
+    # MatrixFeedForwardNetwork for activate_batch; built when first needed.
+    matrix_network = None
+
     def __init__(self, inputs, outputs, node_evals):
         self.input_nodes = inputs
         self.output_nodes = outputs
@@ -24,24 +27,47 @@ class FeedForwardNetwork(object):
 
         return [self.values[i] for i in self.output_nodes]
 
+    def activate_batch(self, inputs):
+        """
+        Activates the network on each row of a (batch, inputs) array at once, returning a
+        (batch, outputs) array. The outputs match activate to within floating-point rounding.
+        Needs NumPy.
+        """
+        if self.matrix_network is None:
+            from neat.nn.matrix import MatrixFeedForwardNetwork  # NumPy is only needed here
+            self.matrix_network = MatrixFeedForwardNetwork(self.input_nodes, self.output_nodes, self.node_evals)
+
+        return self.matrix_network.activate_batch(inputs)
+
+    def compile(self):
+        """
+        Returns the network as a CompiledFeedForwardNetwork: a generated straight-line
+        function giving the same outputs as activate, without the interpreter overhead.
+        """
+        from neat.nn.compiled import CompiledFeedForwardNetwork
+        return CompiledFeedForwardNetwork.from_node_evals(self.input_nodes, self.output_nodes, self.node_evals)
+
     @staticmethod
     def create(genome, config):
         """ Receives a genome and returns its phenotype (a FeedForwardNetwork). """
 
         # Gather expressed connections.
-        connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+        expressed = [cg for cg in genome.connections.values() if cg.enabled]
+        connections = [cg.key for cg in expressed]
 
         layers = feed_forward_layers(config.genome_config.input_keys, config.genome_config.output_keys, connections)
+
+        # Group the inputs of every node that made it into a layer, in one pass over the connections.
+        node_inputs = dict((node, []) for layer in layers for node in layer)
+        for cg in expressed:
+            inode, onode = cg.key
+            if onode in node_inputs:
+                node_inputs[onode].append((inode, cg.weight))
+
         node_evals = []
         for layer in layers:
             for node in layer:
-                inputs = []
-                for conn_key in connections:
-                    inode, onode = conn_key
-                    if onode == node:
-                        cg = genome.connections[conn_key]
-                        inputs.append((inode, cg.weight))
-
+                inputs = node_inputs[node]
                 ng = genome.nodes[node]
                 aggregation_function = config.genome_config.aggregation_function_defs.get(ng.aggregation)
                 activation_function = config.genome_config.activation_defs.get(ng.activation)
@@ -0,0 +1,227 @@
+"""
+Feed-forward and recurrent networks evaluated with NumPy arrays,
+rather than a node at a time with dicts and lists.
+"""
+import numpy as np
+
+from neat.nn.feed_forward import FeedForwardNetwork
+from neat.nn.recurrent import RecurrentNetwork
+from neat.nn.vectorized import vectorize_activation, vectorize_aggregation, sum_aggregation
+
+
+def compile_layers(node_index, layers):
+    """
+    Turns layers of node evals (tuples as in FeedForwardNetwork.node_evals) into
+    arrays. node_index maps each node key to its position in the value vector.
+
+    Within each layer, nodes sharing an activation and aggregation function are
+    grouped, giving (nodes, activation, aggregation, bias, response, sources, weights, mask).
+    For sum aggregation, aggregation is None, sources is a vector of the positions the
+    group reads from, and weights is a dense (nodes x sources) matrix, so the group is one
+    matrix product. Otherwise sources and weights are (nodes x most inputs) arrays padded
+    out with mask False.
+    """
+    compiled = []
+    for layer in layers:
+        groups = {}
+        for node_eval in layer:
+            node, act_func, agg_func, bias, response, links = node_eval
+            groups.setdefault((act_func, agg_func), []).append(node_eval)
+
+        for (act_func, agg_func), group in groups.items():
+            nodes = np.array([node_index[node_eval[0]] for node_eval in group], dtype=int)
+            bias = np.array([node_eval[3] for node_eval in group], dtype=float)
+            response = np.array([node_eval[4] for node_eval in group], dtype=float)
+            aggregation = vectorize_aggregation(agg_func)
+            if aggregation is sum_aggregation:
+                sources = sorted(set(node_index[i] for node_eval in group for i, w in node_eval[5]))
+                column = dict((s, j) for j, s in enumerate(sources))
+                weights = np.zeros((len(group), len(sources)))
+                for row, node_eval in enumerate(group):
+                    for i, w in node_eval[5]:
+                        weights[row, column[node_index[i]]] += w
+                compiled.append((nodes, vectorize_activation(act_func), None, bias, response,
+                                 np.array(sources, dtype=int), weights, None))
+            else:
+                width = max(len(node_eval[5]) for node_eval in group)
+                sources = np.zeros((len(group), width), dtype=int)
+                weights = np.zeros((len(group), width))
+                mask = np.zeros((len(group), width), dtype=bool)
+                for row, node_eval in enumerate(group):
+                    for j, (i, w) in enumerate(node_eval[5]):
+                        sources[row, j] = node_index[i]
+                        weights[row, j] = w
+                        mask[row, j] = True
+                compiled.append((nodes, vectorize_activation(act_func), aggregation, bias, response,
+                                 sources, weights, mask))
+
+    return compiled
+
+
+def evaluate_layers(layers, ivalues, ovalues):
+    """
+    Evaluates compiled layers, reading node values from ivalues and writing them to
+    ovalues (which may be the same array). The value arrays have a row per node and
+    optionally a column per batch entry.
+    """
+    for nodes, activation, aggregation, bias, response, sources, weights, mask in layers:
+        x = ivalues[sources]
+        extra = (1,) * (ivalues.ndim - 1)
+        if aggregation is None:
+            s = weights.dot(x)
+        else:
+            s = aggregation(x * weights.reshape(weights.shape + extra), mask.reshape(mask.shape + extra))
+        ovalues[nodes] = activation(bias.reshape(bias.shape + extra) + response.reshape(response.shape + extra) * s)
+
+
+def check_batch(inputs, ninputs):
+    inputs = np.asarray(inputs, dtype=float)
+    if inputs.ndim != 2 or inputs.shape[1] != ninputs:
+        raise RuntimeError("Expected a (batch, {0:n}) array of inputs, got shape {1!r}".format(ninputs, inputs.shape))
+    return inputs
+
+
+class MatrixFeedForwardNetwork(object):
+    """
+    Gives the same outputs as FeedForwardNetwork (to within floating-point rounding),
+    but evaluates each layer with one matrix product and one vectorized activation
+    per group of nodes sharing activation and aggregation functions. Each layer costs
+    a few NumPy calls however many nodes it has, so this pays off for wide networks
+    rather than long thin chains of nodes.
+    """
+
+    def __init__(self, inputs, outputs, node_evals):
+        self.input_nodes = inputs
+        self.output_nodes = outputs
+        self.node_evals = node_evals
+
+        # Value vector order: inputs, outputs, then the remaining nodes in evaluation order.
+        keys = list(inputs) + [o for o in outputs if o not in inputs]
+        keys += [node_eval[0] for node_eval in node_evals if node_eval[0] not in outputs]
+        self.node_index = dict((k, i) for i, k in enumerate(keys))
+        self.input_index = np.array([self.node_index[k] for k in inputs], dtype=int)
+        self.output_index = np.array([self.node_index[k] for k in outputs], dtype=int)
+        self.values = np.zeros(len(keys))
+
+        # A node's layer is one more than the deepest node feeding it (inputs are layer 0),
+        # which is how feed_forward_layers would have placed it.
+        depth = dict((k, 0) for k in inputs)
+        layers = []
+        for node_eval in node_evals:
+            d = 1 + max([depth[i] for i, w in node_eval[5]] or [0])
+            depth[node_eval[0]] = d
+            while len(layers) < d:
+                layers.append([])
+            layers[d - 1].append(node_eval)
+        self.layers = compile_layers(self.node_index, layers)
+
+    def activate(self, inputs):
+        if len(self.input_nodes) != len(inputs):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(len(self.input_nodes), len(inputs)))
+
+        self.values[self.input_index] = inputs
+        evaluate_layers(self.layers, self.values, self.values)
+
+        return self.values[self.output_index].tolist()
+
+    def activate_batch(self, inputs):
+        """
+        Activates the network on each row of a (batch, inputs) array at once,
+        returning a (batch, outputs) array.
+        """
+        inputs = check_batch(inputs, len(self.input_nodes))
+        values = np.zeros((len(self.values), len(inputs)))
+        values[self.input_index] = inputs.T
+        evaluate_layers(self.layers, values, values)
+
+        return values[self.output_index].T
+
+    @staticmethod
+    def create(genome, config):
+        """ Receives a genome and returns its phenotype (a MatrixFeedForwardNetwork). """
+        net = FeedForwardNetwork.create(genome, config)
+        return MatrixFeedForwardNetwork(net.input_nodes, net.output_nodes, net.node_evals)
+
+
+class MatrixRecurrentNetwork(object):
+    """
+    Gives the same outputs as RecurrentNetwork (to within floating-point rounding),
+    with the two value buffers held as preallocated vectors that swap roles each tick.
+    Every node is updated from the previous tick's values, so an activation is one
+    matrix-vector product and one vectorized activation per group of nodes sharing
+    activation and aggregation functions. As in RecurrentNetwork, the inputs are
+    written into both buffers.
+    """
+
+    def __init__(self, inputs, outputs, node_evals):
+        self.input_nodes = inputs
+        self.output_nodes = outputs
+        self.node_evals = node_evals
+
+        # Value vector order: inputs, outputs, evaluated nodes, then nodes only ever read from.
+        self.node_index = {}
+        for k in list(inputs) + list(outputs):
+            self.node_index.setdefault(k, len(self.node_index))
+        for node_eval in node_evals:
+            self.node_index.setdefault(node_eval[0], len(self.node_index))
+        for node_eval in node_evals:
+            for i, w in node_eval[5]:
+                self.node_index.setdefault(i, len(self.node_index))
+        self.input_index = np.array([self.node_index[k] for k in inputs], dtype=int)
+        self.output_index = np.array([self.node_index[k] for k in outputs], dtype=int)
+        self.layers = compile_layers(self.node_index, [node_evals])
+
+        self.values = np.zeros((2, len(self.node_index)))
+        self.active = 0
+
+        # State for activate_batch, kept apart from the state for activate.
+        self.batch_values = None
+        self.batch_active = 0
+
+    def reset(self):
+        self.values[:] = 0.0
+        self.active = 0
+        self.batch_values = None
+        self.batch_active = 0
+
+    def activate(self, inputs):
+        if len(self.input_nodes) != len(inputs):
+            raise RuntimeError("Expected {0:n} inputs, got {1:n}".format(len(self.input_nodes), len(inputs)))
+
+        ivalues = self.values[self.active]
+        ovalues = self.values[1 - self.active]
+        self.active = 1 - self.active
+
+        ivalues[self.input_index] = inputs
+        ovalues[self.input_index] = inputs
+        evaluate_layers(self.layers, ivalues, ovalues)
+
+        return ovalues[self.output_index].tolist()
+
+    def activate_batch(self, inputs):
+        """
+        Activates the network on each row of a (batch, inputs) array at once, returning a
+        (batch, outputs) array. Each row is a separate copy of the network with its own
+        recurrent state, which carries over between calls as with activate (but separately
+        from it). Changing the batch size starts every row again from zero, as does reset.
+        """
+        inputs = check_batch(inputs, len(self.input_nodes))
+        if self.batch_values is None or self.batch_values.shape[2] != len(inputs):
+            self.batch_values = np.zeros((2, self.values.shape[1], len(inputs)))
+            self.batch_active = 0
+
+        ivalues = self.batch_values[self.batch_active]
+        ovalues = self.batch_values[1 - self.batch_active]
+        self.batch_active = 1 - self.batch_active
+
+        ivalues[self.input_index] = inputs.T
+        ovalues[self.input_index] = inputs.T
+        evaluate_layers(self.layers, ivalues, ovalues)
+
+        return ovalues[self.output_index].T
+
+    @staticmethod
+    def create(genome, config):
+        """ Receives a genome and returns its phenotype (a MatrixRecurrentNetwork). """
+        net = RecurrentNetwork.create(genome, config)
+        return MatrixRecurrentNetwork(net.input_nodes, net.output_nodes, net.node_evals)
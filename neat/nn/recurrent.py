@@ -2,6 +2,9 @@ from neat.graphs import required_for_output
 
 
 class RecurrentNetwork(object):
+    # MatrixRecurrentNetwork for activate_batch, with its own state; built when first needed.
+    matrix_network = None
+
     def __init__(self, inputs, outputs, node_evals):
         self.input_nodes = inputs
         self.output_nodes = outputs
@@ -21,6 +24,8 @@ class RecurrentNetwork(object):
     def reset(self):
         self.values = [dict((k, 0.0) for k in v) for v in self.values]
         self.active = 0
+        if self.matrix_network is not None:
+            self.matrix_network.reset()
 
     def activate(self, inputs):
         if len(self.input_nodes) != len(inputs):
@@ -41,6 +46,20 @@ class RecurrentNetwork(object):
 
         return [ovalues[i] for i in self.output_nodes]
 
+    def activate_batch(self, inputs):
+        """
+        Activates the network on each row of a (batch, inputs) array at once, returning a
+        (batch, outputs) array. Each row is a separate copy of the network with its own
+        recurrent state, which carries over between calls as with activate (but separately
+        from it). Changing the batch size starts every row again from zero, as does reset.
+        The outputs match activate to within floating-point rounding. Needs NumPy.
+        """
+        if self.matrix_network is None:
+            from neat.nn.matrix import MatrixRecurrentNetwork  # NumPy is only needed here
+            self.matrix_network = MatrixRecurrentNetwork(self.input_nodes, self.output_nodes, self.node_evals)
+
+        return self.matrix_network.activate_batch(inputs)
+
     @staticmethod
     def create(genome, config):
         """ Receives a genome and returns its phenotype (a RecurrentNetwork). """
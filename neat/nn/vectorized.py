@@ -0,0 +1,195 @@
+"""
+NumPy versions of the built-in activation and aggregation functions,
+for the network classes that evaluate many nodes at once.
+
+The results match the scalar functions in neat.activations and
+neat.aggregations to within floating-point rounding (NumPy's exp, tanh, etc.
+are not always bit-identical to the math module's).
+"""
+
+import numpy as np
+
+from neat import activations, aggregations
+
+
+def sigmoid_activation(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def tanh_activation(z):
+    z = np.clip(2.5 * z, -60.0, 60.0)
+    return np.tanh(z)
+
+
+def sin_activation(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return np.sin(z)
+
+
+def gauss_activation(z):
+    z = np.clip(z, -3.4, 3.4)
+    return np.exp(-5.0 * z ** 2)
+
+
+def relu_activation(z):
+    return np.where(z > 0.0, z, 0.0)
+
+
+def elu_activation(z):
+    return np.where(z > 0.0, z, np.exp(np.minimum(z, 0.0)) - 1)
+
+
+def lelu_activation(z):
+    leaky = 0.005
+    return np.where(z > 0.0, z, leaky * z)
+
+
+def selu_activation(z):
+    lam = 1.0507009873554804934193349852946
+    alpha = 1.6732632423543772848170429916717
+    return np.where(z > 0.0, lam * z, lam * alpha * (np.exp(np.minimum(z, 0.0)) - 1))
+
+
+def softplus_activation(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 0.2 * np.log(1 + np.exp(z))
+
+
+def identity_activation(z):
+    return np.array(z, dtype=float)
+
+
+def clamped_activation(z):
+    return np.clip(z, -1.0, 1.0)
+
+
+def inv_activation(z):
+    z = np.asarray(z, dtype=float)
+    with np.errstate(divide='ignore', over='ignore'):
+        return np.where(z == 0.0, 0.0, 1.0 / np.where(z == 0.0, 1.0, z))
+
+
+def log_activation(z):
+    z = np.maximum(1e-7, z)
+    return np.log(z)
+
+
+def exp_activation(z):
+    z = np.clip(z, -60.0, 60.0)
+    return np.exp(z)
+
+
+def abs_activation(z):
+    return np.abs(z)
+
+
+def hat_activation(z):
+    return np.maximum(0.0, 1 - np.abs(z))
+
+
+def square_activation(z):
+    return z ** 2
+
+
+def cube_activation(z):
+    return z ** 3
+
+
+# Each aggregation takes an array x of shape (nodes, max inputs, ...) holding the weighted inputs
+# of each node, padded to the same length, and a boolean mask marking the real inputs. The mask has
+# the same number of dimensions as x and broadcasts against it. Each reduces over axis 1.
+# Every node is assumed to have at least one input.
+
+def product_aggregation(x, mask):
+    return np.prod(np.where(mask, x, 1.0), axis=1)
+
+
+def sum_aggregation(x, mask):
+    return np.sum(np.where(mask, x, 0.0), axis=1)
+
+
+def max_aggregation(x, mask):
+    return np.max(np.where(mask, x, -np.inf), axis=1)
+
+
+def min_aggregation(x, mask):
+    return np.min(np.where(mask, x, np.inf), axis=1)
+
+
+def maxabs_aggregation(x, mask):
+    # The first input with the largest magnitude, as max(x, key=abs) picks.
+    index = np.argmax(np.where(mask, np.abs(x), -1.0), axis=1)
+    return np.take_along_axis(x, np.expand_dims(index, 1), axis=1)[:, 0]
+
+
+def median_aggregation(x, mask):
+    # median2 is the usual median: the middle input, or the mean of the middle two.
+    mask = np.broadcast_to(mask, x.shape)
+    n = np.sum(mask, axis=1)
+    x = np.sort(np.where(mask, x, np.inf), axis=1)
+    lo = np.take_along_axis(x, np.expand_dims((n - 1) // 2, 1), axis=1)[:, 0]
+    hi = np.take_along_axis(x, np.expand_dims(n // 2, 1), axis=1)[:, 0]
+    return np.where(n % 2 == 1, lo, (lo + hi) / 2.0)
+
+
+def mean_aggregation(x, mask):
+    return np.sum(np.where(mask, x, 0.0), axis=1) / np.sum(mask, axis=1)
+
+
+activation_functions = {activations.sigmoid_activation: sigmoid_activation,
+                        activations.tanh_activation: tanh_activation,
+                        activations.sin_activation: sin_activation,
+                        activations.gauss_activation: gauss_activation,
+                        activations.relu_activation: relu_activation,
+                        activations.elu_activation: elu_activation,
+                        activations.lelu_activation: lelu_activation,
+                        activations.selu_activation: selu_activation,
+                        activations.softplus_activation: softplus_activation,
+                        activations.identity_activation: identity_activation,
+                        activations.clamped_activation: clamped_activation,
+                        activations.inv_activation: inv_activation,
+                        activations.log_activation: log_activation,
+                        activations.exp_activation: exp_activation,
+                        activations.abs_activation: abs_activation,
+                        activations.hat_activation: hat_activation,
+                        activations.square_activation: square_activation,
+                        activations.cube_activation: cube_activation}
+
+aggregation_functions = {aggregations.product_aggregation: product_aggregation,
+                         aggregations.sum_aggregation: sum_aggregation,
+                         aggregations.max_aggregation: max_aggregation,
+                         aggregations.min_aggregation: min_aggregation,
+                         aggregations.maxabs_aggregation: maxabs_aggregation,
+                         aggregations.median_aggregation: median_aggregation,
+                         aggregations.mean_aggregation: mean_aggregation}
+
+
+def vectorize_activation(function):
+    """
+    Returns the NumPy version of a built-in activation function. User-defined
+    functions are wrapped to be applied element by element.
+    """
+    f = activation_functions.get(function)
+    if f is None:
+        f = np.vectorize(function, otypes=[float])
+    return f
+
+
+def vectorize_aggregation(function):
+    """
+    Returns the NumPy version of a built-in aggregation function. User-defined
+    functions are wrapped to be called once per node (and per batch column)
+    on the list of its inputs.
+    """
+    f = aggregation_functions.get(function)
+    if f is None:
+        def f(x, mask):
+            mask = np.broadcast_to(mask, x.shape)
+            out = np.empty((x.shape[0],) + x.shape[2:])
+            for index in np.ndindex(*out.shape):
+                node_inputs = x[(index[0], slice(None)) + index[1:]]
+                node_mask = mask[(index[0], slice(None)) + index[1:]]
+                out[index] = function(node_inputs[node_mask].tolist())
+            return out
+    return f
@@ -2,7 +2,7 @@
 from itertools import count
 
 from neat.config import ConfigParameter, DefaultClassConfig
-from neat.math_util import mean, stdev
+from neat.math_util import RunningStatistics
 
 
 class Species(object):
@@ -25,31 +25,49 @@ class Species(object):
 
 
 class GenomeDistanceCache(object):
+    """
+    Distances between genomes, keyed by the pair of genome keys in either order, so each
+    pair is computed and stored once. Kept across generations by DefaultSpeciesSet, which
+    relies on a genome not changing once it has a key (as in Population and DefaultReproduction).
+    The count, mean and variance of the distances computed are kept in statistics.
+    """
+
     def __init__(self, config):
         self.distances = {}
         self.config = config
         self.hits = 0
         self.misses = 0
+        self.statistics = RunningStatistics()
 
     def __call__(self, genome0, genome1):
         g0 = genome0.key
         g1 = genome1.key
-        d = self.distances.get((g0, g1))
+        key = (g0, g1) if g0 <= g1 else (g1, g0)
+        d = self.distances.get(key)
         if d is None:
             # Distance is not already computed.
             d = genome0.distance(genome1, self.config)
-            self.distances[g0, g1] = d
-            self.distances[g1, g0] = d
+            self.distances[key] = d
             self.misses += 1
+            self.statistics.add(d)
         else:
             self.hits += 1
 
         return d
 
+    def evict(self, keep):
+        """ Forgets the distances involving any genome whose key is not in keep. """
+        self.distances = dict((key, d) for key, d in self.distances.items()
+                              if key[0] in keep and key[1] in keep)
+
 
 class DefaultSpeciesSet(DefaultClassConfig):
     """ Encapsulates the default speciation scheme. """
 
+    # Distances kept from one generation to the next, so only pairs involving new genomes
+    # are computed.
+    distance_cache = None
+
     def __init__(self, config, reporters):
         # pylint: disable=super-init-not-called
         self.species_set_config = config
@@ -61,7 +79,8 @@ class DefaultSpeciesSet(DefaultClassConfig):
     @classmethod
     def parse_config(cls, param_dict):
         return DefaultClassConfig(param_dict,
-                                  [ConfigParameter('compatibility_threshold', float)])
+                                  [ConfigParameter('compatibility_threshold', float),
+                                   ConfigParameter('distance_report', bool, True)])
 
     def speciate(self, config, population, generation):
         """
@@ -77,9 +96,18 @@ class DefaultSpeciesSet(DefaultClassConfig):
 
         compatibility_threshold = self.species_set_config.compatibility_threshold
 
+        # Distances involving genomes from earlier generations are only needed for
+        # the current representatives.
+        if self.distance_cache is None:
+            self.distance_cache = GenomeDistanceCache(config.genome_config)
+        distances = self.distance_cache
+        distances.config = config.genome_config
+        distances.evict(set(population).union(s.representative.key for s in self.species.values()))
+        distances.statistics = RunningStatistics()
+        hits, misses = distances.hits, distances.misses
+
         # Find the best representatives for each existing species.
         unspeciated = set(population)
-        distances = GenomeDistanceCache(config.genome_config)
         new_representatives = {}
         new_members = {}
         for sid, s in self.species.items():
@@ -119,7 +147,27 @@ class DefaultSpeciesSet(DefaultClassConfig):
                 new_representatives[sid] = gid
                 new_members[sid] = [gid]
 
-        # Update species collection based on new speciation.
+        self.update_species(population, generation, new_representatives, new_members)
+
+        # Mean and std genetic distance info report, over the distances computed this generation
+        if self.species_set_config.distance_report:
+            if distances.statistics.count:
+                self.report_distances(distances.statistics.count, distances.statistics.mean,
+                                      distances.statistics.stdev())
+            self.reporters.info('Genetic distance cache: {0:d} hits, {1:d} misses, {2:d} distances kept'.format(
+                distances.hits - hits, distances.misses - misses, len(distances.distances)))
+
+    def report_distances(self, count, mean, stdev):
+        """
+        Reports the mean and standard deviation of the genetic distances computed this
+        generation. Distances kept from earlier generations, and pairs never compared,
+        are not included, so this is not the mean over all pairs in the population.
+        """
+        self.reporters.info('Mean genetic distance {0:.3f}, standard deviation {1:.3f}, '
+                            'over the {2:d} distances computed this generation'.format(mean, stdev, count))
+
+    def update_species(self, population, generation, new_representatives, new_members):
+        """ Update species collection based on new speciation. """
         self.genome_to_species = {}
         for sid, rid in new_representatives.items():
             s = self.species.get(sid)
@@ -134,13 +182,6 @@ class DefaultSpeciesSet(DefaultClassConfig):
             member_dict = dict((gid, population[gid]) for gid in members)
             s.update(population[rid], member_dict)
 
-        # Mean and std genetic distance info report
-        if len(population) > 1:
-            gdmean = mean(distances.distances.values())
-            gdstdev = stdev(distances.distances.values())
-            self.reporters.info(
-                'Mean genetic distance {0:.3f}, standard deviation {1:.3f}'.format(gdmean, gdstdev))
-
     def get_species_id(self, individual_id):
         return self.genome_to_species[individual_id]
 